@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+
+"""Times the main steps of team formation on synthetic classes.
+
+Usage::
+
+    python benchmark.py                          # the default sizes
+    python benchmark.py --students 5000 --projects 500
+    python benchmark.py --students 50000 --projects 5000 --skip optimize
+
+"""
+
+# builtin
+import sys
+import time
+import argparse
+import tempfile
+
+# external
+import numpy as np
+import pandas as pd
+
+# local
+from teamo import (populate_students, populate_projects, read_catme,
+                   rank_projects, rank_projects_weighted, compute_num_teams,
+                   MultipleChoiceSingleAnswerQuestion, ProjectRankQuestion,
+                   EncodedStudents)
+from optimize import (MultipleChoiceCriterion, ProjectRankCriterion,
+                      assign_projects, optimize_teams)
+from synthetic import generate_cohort
+
+DEFAULT_SIZES = [(100, 10), (1000, 100), (10000, 1000)]
+
+
+def best_time(func, repeat):
+    """Returns the shortest wall time of calling func repeat times and the
+    result of the last call."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def run_benchmarks(num_students, num_projects, directory, repeat=3,
+                   min_team_size=4, skip=(), seed=0):
+    """Returns a list of (benchmark name, seconds) for one class size."""
+    cohort = generate_cohort(directory, num_students, num_projects,
+                             seed=seed)
+    timings = []
+
+    def bench(name, func, times=repeat):
+        if name.split(' ')[0] in skip:
+            return None
+        seconds, result = best_time(func, times)
+        timings.append((name, seconds))
+        return result
+
+    roster = pd.read_csv(cohort.roster)
+    catme = pd.read_csv(cohort.catme)
+    bench('read_catme pandas.read_csv', lambda: pd.read_csv(cohort.catme))
+    compact = bench('read_catme chunked',
+                    lambda: read_catme(cohort.catme, chunksize=10000))
+    students = bench('populate_students',
+                     lambda: populate_students(roster, catme))
+    if students is None:
+        students = populate_students(roster, catme)
+    if compact is not None:
+        bench('populate_students encoded from tables',
+              lambda: EncodedStudents.from_tables(roster, compact))
+
+    projects = bench('populate_projects',
+                     lambda: populate_projects(cohort.project_dir))
+    bench('populate_projects workers=4',
+          lambda: populate_projects(cohort.project_dir, workers=4))
+    cache_path = cohort.project_dir + '.json'
+    populate_projects(cohort.project_dir, cache_path=cache_path)
+    bench('populate_projects cached',
+          lambda: populate_projects(cohort.project_dir,
+                                    cache_path=cache_path))
+    if projects is None:
+        projects = populate_projects(cohort.project_dir)
+
+    bench('rank_projects', lambda: rank_projects(students, projects))
+    bench('rank_projects_weighted',
+          lambda: rank_projects_weighted(students, projects))
+    ranked = EncodedStudents(students.values())
+    bench('rank_projects_weighted encoded',
+          lambda: rank_projects_weighted(ranked, projects))
+
+    people = list(students.values())
+    for person in people:
+        if not person.selections:
+            person.selections = cohort.project_ids[:5]
+    num_teams, max_in_team, _ = compute_num_teams(len(people), min_team_size,
+                                                  len(projects))
+    team_projects = cohort.project_ids[:num_teams]
+    teams = np.arange(len(people)) % num_teams
+    encoded = EncodedStudents(people, cohort.project_ids)
+
+    gpa_question = MultipleChoiceSingleAnswerQuestion(
+        'GPA?', ['high', 'mid', 'low'])
+    gpas = ['high' if p.gpa and p.gpa > 3.3 else 'mid' if p.gpa and
+            p.gpa > 2.6 else 'low' for p in people]
+    codes = gpa_question.encode(gpas)
+    members = [np.flatnonzero(teams == t) for t in range(num_teams)]
+
+    bench('scoring multiple choice per team', lambda: [
+        gpa_question.compute_score([gpas[i] for i in m]) for m in members])
+    bench('scoring multiple choice batch',
+          lambda: gpa_question.compute_scores(codes, teams, num_teams))
+
+    selections = [p.selections for p in people]
+    rank_question = ProjectRankQuestion(cohort.project_ids)
+    bench('scoring project rank per team', lambda: [
+        rank_question.compute_score(team_projects[t],
+                                    [selections[i] for i in m], ordered=True)
+        for t, m in enumerate(members)])
+    bench('scoring project rank index',
+          lambda: rank_question.index_responses(selections))
+    rank_question.index_responses(selections)
+    bench('scoring project rank batch',
+          lambda: rank_question.compute_scores(teams, num_teams,
+                                               ordered=True))
+    bench('scoring encode students',
+          lambda: EncodedStudents(people, cohort.project_ids))
+    del encoded
+
+    bench('assign_projects', lambda: assign_projects(
+        people, [projects[p] for p in team_projects], min_team_size,
+        max_in_team), times=1)
+
+    criteria = [MultipleChoiceCriterion(gpa_question, gpas),
+                ProjectRankCriterion(ProjectRankQuestion(cohort.project_ids),
+                                     selections, team_projects,
+                                     ordered=True)]
+    bench('optimize_teams 20000 iterations', lambda: optimize_teams(
+        len(people), num_teams, criteria, max_iterations=20000, seed=seed),
+        times=1)
+
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, nargs='*',
+                        help='class sizes to run')
+    parser.add_argument('--projects', type=int, nargs='*',
+                        help='number of projects for each class size')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='report the best of this many runs')
+    parser.add_argument('--skip', nargs='*', default=[],
+                        help='benchmarks to skip, by the first word of their '
+                        'name')
+    args = parser.parse_args(argv)
+
+    if args.students:
+        projects = args.projects or [max(10, n // 10) for n in args.students]
+        sizes = list(zip(args.students, projects))
+    else:
+        sizes = DEFAULT_SIZES
+
+    for num_students, num_projects in sizes:
+        print('{} students, {} projects'.format(num_students, num_projects))
+        with tempfile.TemporaryDirectory() as directory:
+            timings = run_benchmarks(num_students, num_projects, directory,
+                                     repeat=args.repeat, skip=args.skip)
+        for name, seconds in timings:
+            print('  {:<40} {:10.4f} s'.format(name, seconds))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
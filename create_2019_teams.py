@@ -6,7 +6,8 @@ import yaml
 import pandas
 
 from teamo import (rank_projects, rank_projects_weighted, populate_projects,
-                   populate_students, compute_num_teams, Team)
+                   populate_students, compute_num_teams, project_cache_path,
+                   Team, StudentPool, SectionIndex, ChoiceIndex)
 
 YEAR = '2019'
 
@@ -33,7 +34,8 @@ MAX_NUM_TEAMS_PER_SECTION = 11
 catme = pandas.read_csv(PATH_TO_CATME)
 roster = pandas.read_csv(PATH_TO_ROSTER)
 
-projects = populate_projects(PATH_TO_PROJ_DIR)
+projects = populate_projects(PATH_TO_PROJ_DIR,
+                             cache_path=project_cache_path(PATH_TO_PROJ_DIR))
 students = populate_students(roster, catme)
 
 num_teams, max_in_team, num_larger_teams = \
@@ -49,7 +51,9 @@ rankings = rank_projects_weighted(students, projects)
 print('Weight Project Rankings:')
 print(rankings)
 
-available_pool = [students[n] for n in list(roster['Name'])]
+available_pool = StudentPool(students[n] for n in list(roster['Name']))
+# who is still available for each section
+eligibility = available_pool.add_index(SectionIndex())
 
 # Add students to teams that were chosen apriori. If the team is full then
 # remove the project from the list of available projects.
@@ -98,24 +102,18 @@ for name, student in students.items():
 
 # Populate each project's team with up to three members from the pool.
 
-
-def sort_by_project_rank(people, proj_id):
-    def sort_score(person):
-        idx = person.selections.index(proj_id)
-        return 5 - idx
-    return sorted(people, key=sort_score, reverse=True)
+# who still available chose each project at which rank
+choosers = available_pool.add_index(ChoiceIndex())
 
 section_proj_count = {'A02': 0, 'A03': 0}
 
 
 def get_people_who_selected(project):
-    people_who_selected = [student for student in available_pool if
-                           student.chose_project(project.id)]
-    #print('{} people selected this project'.format(len(people_who_selected)))
     # NOTE : shuffle() gives some randomization for the order of people who
     # ranked equivilantly
-    shuffle(people_who_selected)
-    return sort_by_project_rank(people_who_selected, project.id)
+    people_who_selected = choosers.choosers(project.id, shuffle=shuffle)
+    #print('{} people selected this project'.format(len(people_who_selected)))
+    return people_who_selected
 
 for project in selected:
 
@@ -128,7 +126,7 @@ for project in selected:
 
     people_who_selected = get_people_who_selected(project)
 
-    used = []
+    used = set()
     for i, person in enumerate(people_who_selected):
         # TODO : if three (or four) males on team, don't add woman
 
@@ -144,41 +142,40 @@ for project in selected:
                     pass
             else:
                 proj_section = project.team.section()
+                eligible = eligibility.eligible(proj_section)
                 #print('females', project.team.num_females())
                 if project.team.has_only_one_female():
                     # try to pick one more woman first
                     nonmales = [s for s in people_who_selected[i:]
-                                if s.gender != 'Male' and s.can_attend(proj_section)]
+                                if s.gender != 'Male' and s in eligible]
                     if nonmales:
                         for nonmale in nonmales:
-                            if person.can_attend(proj_section):
+                            if person in eligible:
                                 project.team.add_member(nonmale)
-                                used.append(nonmale)
+                                used.add(nonmale)
                                 #print('Added second female:', nonmale)
                                 break  # from nonmales for loop (only add one femal)
                     else:
-                        if person.can_attend(proj_section):
+                        if person in eligible:
                             project.team.add_member(person)
                             #print('Couldnt add female so added:', person)
                 else:
-                    if person.can_attend(proj_section):
+                    if person in eligible:
                         project.team.add_member(person)
                         #print('Added:', person)
 
     for member in project.team.members:
-        try:
-            available_pool.remove(member)
-        except:  # fixed team member already removed from pool
-            pass
+        # fixed team members were already removed from the pool
+        available_pool.discard(member)
 
     section_proj_count[proj_section] += 1
 
-for person in available_pool.copy():
-    possible = []
-    for project in selected:
-        if person.can_attend(project.team.section()):
-            possible.append(project.id)
-    possible = list(set(possible).intersection(set(person.selections)))
+selected_id_set = set(p.id for p in selected)
+for person in list(available_pool):
+    # only the person's choices need checking, not every selected project
+    possible = [proj_id for proj_id in set(person.selections)
+                if proj_id in selected_id_set and eligibility.can_attend(
+                    person, projects[proj_id].team.section())]
     num_in_possible = [projects[p].team.num_members() for p in possible]
     possible = [x for (y, x) in sorted(zip(num_in_possible, possible))]
     if possible:
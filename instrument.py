@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+"""Lightweight timers and counters for finding where a run spends its time.
+
+Instrumentation is off by default, in which case the timers and counters do
+next to nothing. Turn it on, run, and dump the profile::
+
+    import instrument
+
+    instrument.enable()
+    ...  # run the team formation
+    instrument.dump('profile.json')
+
+The library functions record themselves under names like ``load.students``
+and code can add its own::
+
+    with instrument.stage('select'):
+        ...
+    instrument.count('swaps.accepted', 10)
+
+"""
+
+# builtin
+import json
+import time
+from functools import wraps
+
+
+class _NullStage(object):
+    """Context manager that does nothing, used when disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+
+    def __init__(self, recorder, name):
+        self._recorder = recorder
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._recorder.add_time(self._name,
+                                time.perf_counter() - self._start)
+        return False
+
+
+class Recorder(object):
+    """Collects the wall time spent in named stages and named counters."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        """Clears all of the recorded times and counts."""
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+
+    def stage(self, name):
+        """Returns a context manager that adds the time spent in it to the
+        named stage."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def add_time(self, name, seconds):
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, value=1):
+        """Adds the value to the named counter."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def report(self):
+        """Returns a dictionary with the seconds and number of calls of each
+        stage and the value of each counter."""
+        stages = {name: {'seconds': self.times[name],
+                         'calls': self.calls[name]} for name in self.times}
+        return {'stages': stages, 'counters': dict(self.counters)}
+
+    def dump(self, path):
+        """Writes the report to a JSON file."""
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2, sort_keys=True)
+
+    def summary(self):
+        """Returns the report as a human readable table."""
+        lines = []
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            lines.append('{:<30} {:10.4f} s {:8d} calls'.format(
+                name, self.times[name], self.calls[name]))
+        for name in sorted(self.counters):
+            lines.append('{:<30} {:>10}'.format(name, self.counters[name]))
+        return '\n'.join(lines)
+
+
+RECORDER = Recorder()
+
+
+def enable():
+    """Turns on the recording and clears anything recorded before."""
+    RECORDER.reset()
+    RECORDER.enabled = True
+
+
+def disable():
+    RECORDER.enabled = False
+
+
+def stage(name):
+    """Returns a context manager timing the named stage, see
+    ``Recorder.stage()``."""
+    return RECORDER.stage(name)
+
+
+def count(name, value=1):
+    """Adds the value to the named counter, see ``Recorder.count()``."""
+    RECORDER.count(name, value)
+
+
+def report():
+    return RECORDER.report()
+
+
+def dump(path):
+    RECORDER.dump(path)
+
+
+def timed(name):
+    """Decorator that records each call of the function as the named
+    stage."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not RECORDER.enabled:
+                return func(*args, **kwargs)
+            with RECORDER.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,347 @@
+#!/usr/bin/env python
+
+"""Sends the emails generated by ``team_emails.py``.
+
+The emails are sent over a small pool of SMTP connections that are kept open
+between messages, no faster than a given number of messages per second.
+Transient failures, i.e. dropped connections and 4xx replies, are retried
+with an increasing delay. The outcome of every message is appended to a
+journal file as a JSON line, and running again with the same journal skips
+the messages that were already sent, so an interrupted run can be resumed.
+
+Each message has the reStructuredText of the email as the plain text part
+and the rendered HTML as an alternative. An email that can't be rendered is
+recorded as failed and not sent.
+
+Usage::
+
+    python mailer.py catme-data-with-teams.csv sponsors.csv sent.jsonl \
+        --sender jkmoore@ucdavis.edu --host smtp.ucdavis.edu --port 587 \
+        --starttls --user jkmoore --rate 1
+
+The password, if needed, is read from the ``TEAMO_SMTP_PASSWORD`` environment
+variable or asked for.
+
+"""
+
+# builtin
+import os
+import sys
+import json
+import time
+import asyncio
+import getpass
+import smtplib
+import argparse
+from email.message import EmailMessage
+from collections import namedtuple
+
+# external
+import pandas as pd
+from docutils import ApplicationError
+
+# local
+import team_emails
+from parse_rst import render_html
+
+Delivery = namedtuple('Delivery', ['key', 'status', 'attempts', 'error'])
+
+
+def message_key(email):
+    """Returns the key of an email in the journal."""
+    return '{}:{}'.format(email.kind, email.project_id)
+
+
+def is_transient(error):
+    """Returns True if sending again later may succeed."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500
+                   for code, msg in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # the other smtplib errors are also OSErrors
+    return (isinstance(error, OSError) and
+            not isinstance(error, smtplib.SMTPException))
+
+
+def build_message(email, sender, html=True):
+    """Returns the email as an ``EmailMessage``, raising the docutils error
+    if it can't be rendered to HTML."""
+    message = EmailMessage()
+    message['Subject'] = email.subject
+    message['From'] = sender
+    message['To'] = ', '.join(email.recipients)
+    message.set_content(email.rst)
+    if html:
+        parts = render_html(email.rst, team_emails.RENDER_SETTINGS)
+        message.add_alternative(parts['whole'], subtype='html')
+    return message
+
+
+class Journal(object):
+    """Delivery statuses appended to a JSON lines file, one line per
+    attempted message. The last line of a key is its status."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.statuses = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.statuses[record['key']] = record['status']
+
+    def sent(self, key):
+        return self.statuses.get(key) == 'sent'
+
+    def record(self, delivery):
+        self.statuses[delivery.key] = delivery.status
+        if self.path is not None:
+            record = dict(delivery._asdict(), time=time.time())
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+class _Throttle(object):
+    """Spaces the sends at least 1/rate seconds apart."""
+
+    def __init__(self, rate=None):
+        self.interval = 0.0 if not rate else 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Mailer(object):
+    """Sends emails over a pool of reused SMTP connections.
+
+    Parameters
+    ==========
+    host : string
+    port : integer
+    sender : string
+        The From address.
+    username : string, optional
+        Logs in with this and the password if given.
+    password : string, optional
+    starttls : boolean
+        If True, the connections are upgraded to TLS before logging in.
+    connections : integer
+        The number of connections, i.e. of messages sent at once.
+    rate : float, optional
+        The maximum number of messages sent per second.
+    retries : integer
+        The number of times a transient failure is retried.
+    backoff : float
+        The seconds waited before the first retry, doubled for each next
+        one.
+    journal : string, optional
+        The path to the journal of the deliveries. Messages that it records
+        as sent are skipped.
+    html : boolean
+        If True, the emails are sent with an HTML alternative.
+    timeout : float
+        The timeout of the SMTP connections in seconds.
+
+    """
+
+    def __init__(self, host='localhost', port=25, sender=None, username=None,
+                 password=None, starttls=False, connections=2, rate=None,
+                 retries=3, backoff=1.0, journal=None, html=True,
+                 timeout=30.0):
+        if sender is None:
+            raise ValueError('The sender address is required.')
+        if connections < 1:
+            raise ValueError('At least one connection is required.')
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.connections = connections
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.journal = Journal(journal)
+        self.html = html
+        self.timeout = timeout
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username is not None:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def _send(self, connection, message):
+        """Sends the message over the connection, opening it if it is None,
+        and returns the connection and the refused recipients."""
+        if connection is None:
+            connection = self._connect()
+        return connection, connection.send_message(message)
+
+    @staticmethod
+    def _close(connection):
+        if connection is None:
+            return
+        try:
+            connection.quit()
+        except OSError:
+            connection.close()
+
+    async def _deliver(self, loop, connection, throttle, key, message):
+        """Returns the connection, to reuse, and the delivery."""
+        attempts = 0
+        while True:
+            attempts += 1
+            await throttle.wait()
+            try:
+                connection, refused = await loop.run_in_executor(
+                    None, self._send, connection, message)
+            except OSError as error:
+                # smtplib resets the connection after a refusal, anything
+                # else may have left it broken
+                if not isinstance(error, (smtplib.SMTPResponseException,
+                                          smtplib.SMTPRecipientsRefused)):
+                    await loop.run_in_executor(None, self._close, connection)
+                    connection = None
+                if not is_transient(error) or attempts > self.retries:
+                    return connection, Delivery(key, 'failed', attempts,
+                                                str(error))
+                await asyncio.sleep(self.backoff * 2 ** (attempts - 1))
+            else:
+                error = None
+                if refused:
+                    error = 'Refused: {}'.format(', '.join(sorted(refused)))
+                return connection, Delivery(key, 'sent', attempts, error)
+
+    async def _worker(self, loop, queue, throttle, deliveries):
+        connection = None
+        try:
+            while True:
+                try:
+                    email = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                key = message_key(email)
+                try:
+                    message = await loop.run_in_executor(
+                        None, build_message, email, self.sender, self.html)
+                except ApplicationError as error:
+                    delivery = Delivery(key, 'failed', 0, str(error))
+                else:
+                    connection, delivery = await self._deliver(
+                        loop, connection, throttle, key, message)
+                self.journal.record(delivery)
+                deliveries[key] = delivery
+        finally:
+            await loop.run_in_executor(None, self._close, connection)
+
+    async def send(self, emails):
+        """Sends the emails that the journal doesn't record as sent and
+        returns the deliveries in the order of the emails, skipped ones
+        included with the status "skipped"."""
+        loop = asyncio.get_running_loop()
+        emails = list(emails)
+        keys = [message_key(email) for email in emails]
+        if len(set(keys)) != len(keys):
+            raise ValueError('There is more than one email per kind and '
+                             'project.')
+        queue = asyncio.Queue()
+        deliveries = {}
+        for key, email in zip(keys, emails):
+            if self.journal.sent(key):
+                deliveries[key] = Delivery(key, 'skipped', 0, None)
+            else:
+                queue.put_nowait(email)
+        throttle = _Throttle(self.rate)
+        num_workers = min(self.connections, queue.qsize())
+        await asyncio.gather(*[
+            self._worker(loop, queue, throttle, deliveries)
+            for i in range(num_workers)])
+        return [deliveries[key] for key in keys]
+
+    def send_all(self, emails):
+        """Sends the emails from outside of an event loop, see
+        ``send()``."""
+        return asyncio.run(self.send(emails))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Send the team emails.')
+    parser.add_argument('students',
+                        help='the CATME export with the teams added')
+    parser.add_argument('sponsors', help='the sponsors table')
+    parser.add_argument('journal', help='the delivery journal, to resume')
+    parser.add_argument('--sender', required=True, help='the From address')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=25)
+    parser.add_argument('--starttls', action='store_true')
+    parser.add_argument('--user', help='log in with this user name')
+    parser.add_argument('--connections', type=int, default=2)
+    parser.add_argument('--rate', type=float,
+                        help='the maximum messages per second')
+    parser.add_argument('--retries', type=int, default=3)
+    parser.add_argument('--kind', action='append',
+                        choices=['acceptance', 'rejection', 'funding'],
+                        help='only send this kind of email, can be repeated')
+    parser.add_argument('--year', type=int,
+                        help='the year of the course (default: this year)')
+    parser.add_argument('--ta-email', action='append',
+                        type=team_emails.parse_ta_email, default=[],
+                        metavar='NAME=ADDRESS',
+                        help="a TA's email address, can be repeated")
+    args = parser.parse_args(argv)
+
+    emails = team_emails.generate_emails(pd.read_csv(args.students),
+                                         pd.read_csv(args.sponsors),
+                                         ta_emails=dict(args.ta_email),
+                                         year=args.year)
+    kinds = args.kind or list(emails)
+    emails = [e for kind in kinds for e in emails[kind]]
+
+    password = None
+    if args.user is not None:
+        password = os.environ.get('TEAMO_SMTP_PASSWORD')
+        if password is None:
+            password = getpass.getpass()
+
+    mailer = Mailer(args.host, args.port, args.sender, username=args.user,
+                    password=password, starttls=args.starttls,
+                    connections=args.connections, rate=args.rate,
+                    retries=args.retries, journal=args.journal)
+    deliveries = mailer.send_all(emails)
+
+    for delivery in deliveries:
+        if delivery.status == 'failed' or delivery.error is not None:
+            print('{} {}: {}'.format(delivery.key, delivery.status,
+                                     delivery.error))
+    counts = {}
+    for delivery in deliveries:
+        counts[delivery.status] = counts.get(delivery.status, 0) + 1
+    print(', '.join('{} {}'.format(n, status)
+                    for status, n in sorted(counts.items())))
+    return 1 if counts.get('failed') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
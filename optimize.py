@@ -0,0 +1,745 @@
+#!/usr/bin/env python
+
+"""Swap based local search for forming teams.
+
+This follows the Team-Maker approach of Layton et al. (2010): each team gets
+a score that is the weighted sum of its scores for the instructor's questions
+and, starting from an initial assignment, students are repeatedly moved or
+swapped between teams whenever that improves the total. Only the two teams
+involved in a move are rescored.
+
+"""
+
+# builtin
+import time
+from random import Random
+from heapq import heappush, heappop, heapify, heapreplace
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# external
+import numpy as np
+
+# local
+import instrument
+
+
+class MultipleChoiceCriterion(object):
+    """Scores teams with a MultipleChoiceSingleAnswerQuestion. A positive
+    weight favors heterogeneous teams and a negative weight homogeneous
+    ones."""
+
+    def __init__(self, question, responses, weight=1.0):
+        """
+        Parameters
+        ==========
+        question : MultipleChoiceSingleAnswerQuestion
+        responses : iterable
+            The response of every student.
+        weight : float, optional
+
+        """
+        self.question = question
+        self.weight = weight
+        self.codes = question.encode(responses)
+        self._codes = self.codes.tolist()
+
+    def team_score(self, team, members):
+        distinct = len(set(self._codes[m] for m in members) - {-1})
+        return distinct / len(members)
+
+    def team_scores(self, teams, num_teams):
+        return self.question.compute_scores(self.codes, teams, num_teams)
+
+
+class UnderrepresentedCriterion(object):
+    """Scores teams with an UnderrepresentedMemberQuestion, i.e. penalizes
+    teams with a single underrepresented member."""
+
+    def __init__(self, question, responses, weight=1.0):
+        """
+        Parameters
+        ==========
+        question : UnderrepresentedMemberQuestion
+        responses : iterable
+            The response of every student, e.g. their gender.
+        weight : float, optional
+
+        """
+        self.question = question
+        self.weight = weight
+        self.flags = np.array([r in question.underrep_groups
+                               for r in responses], dtype=bool)
+        self._flags = self.flags.tolist()
+
+    @staticmethod
+    def _score(num_underrep):
+        if num_underrep == 0:
+            return 0
+        elif num_underrep == 1:
+            return -1
+        else:
+            return 1
+
+    def team_score(self, team, members):
+        return self._score(sum(self._flags[m] for m in members))
+
+    def team_scores(self, teams, num_teams):
+        teams = np.asarray(teams)
+        keep = teams >= 0
+        nums = np.bincount(teams[keep], weights=self.flags[keep],
+                           minlength=num_teams)
+        return np.select([nums == 0, nums == 1], [0, -1], 1)
+
+
+class ProjectRankCriterion(object):
+    """Scores teams with a ProjectRankQuestion for the project each team is
+    assigned to."""
+
+    def __init__(self, question, responses, team_projects, ordered=False,
+                 weight=1.0):
+        """
+        Parameters
+        ==========
+        question : ProjectRankQuestion
+        responses : iterable of iterable
+            The ranked project choices of every student.
+        team_projects : sequence of string
+            The id of the project each team is assigned to.
+        ordered : boolean, optional
+            If True, higher ranked choices score higher.
+        weight : float, optional
+
+        """
+        self.question = question
+        self.weight = weight
+        self.ordered = ordered
+        self.team_projects = list(team_projects)
+        question.index_responses(responses)
+        lookup = {p: j for j, p in enumerate(question.projects)}
+        self._team_columns = [lookup[p] for p in self.team_projects]
+        self._lengths = question.response_lengths.tolist()
+        # the 1-based position of each chosen project keyed by student, the
+        # last one of a project chosen twice as in the question
+        self._positions = [{} for _ in self._lengths]
+        for i, response in enumerate(responses):
+            for k, proj_id in enumerate(response or []):
+                self._positions[i][proj_id] = k + 1
+
+    def team_score(self, team, members):
+        proj_id = self.team_projects[team]
+        positions = [self._positions[m].get(proj_id) for m in members]
+        if not self.ordered:
+            return sum(p is not None for p in positions) / len(members)
+        max_rank = max(self._lengths[m] for m in members)
+        ranks = sum(max_rank + 1 - p for p in positions if p is not None)
+        return ranks / len(members) / max_rank
+
+    def team_scores(self, teams, num_teams):
+        scores = self.question.compute_scores(teams, num_teams,
+                                              ordered=self.ordered)
+        return scores[np.arange(num_teams), self._team_columns]
+
+
+def section_feasibility(students, team_sections):
+    """Returns a (num_students, num_teams) boolean array that is True where
+    the student can attend the section the team meets in.
+
+    Parameters
+    ==========
+    students : EncodedStudents
+    team_sections : array_like of integer, shape(num_teams,)
+        The section code, as in ``students.section_labels``, of each team or
+        -1 if the team can meet in any section.
+
+    """
+    team_sections = np.asarray(team_sections, dtype=int)
+    return ((team_sections[np.newaxis, :] < 0) |
+            students.willing_to_switch[:, np.newaxis] |
+            (students.sections[:, np.newaxis] ==
+             team_sections[np.newaxis, :]))
+
+
+def initial_assignment(num_students, num_teams, feasible=None, max_size=None,
+                       seed=None):
+    """Returns a random assignment of students to teams with balanced team
+    sizes. The students with the fewest feasible teams are placed first, each
+    on the smallest feasible team.
+
+    Parameters
+    ==========
+    num_students : integer
+    num_teams : integer
+    feasible : array_like of boolean, shape(num_students, num_teams), optional
+        True where the student may be placed on the team.
+    max_size : integer, optional
+        The largest allowed team, defaults to an even split.
+    seed : integer or random.Random, optional
+
+    Returns
+    =======
+    teams : ndarray of integer, shape(num_students,)
+        The team index of each student.
+
+    """
+    rng = seed if isinstance(seed, Random) else Random(seed)
+    if max_size is None:
+        max_size = -(-num_students // num_teams)
+    if feasible is None:
+        feasible = np.ones((num_students, num_teams), dtype=bool)
+    feasible = np.asarray(feasible, dtype=bool)
+
+    order = list(range(num_students))
+    rng.shuffle(order)
+    num_feasible = feasible.sum(axis=1)
+    order.sort(key=lambda i: num_feasible[i])
+
+    teams = np.full(num_students, -1, dtype=int)
+    sizes = [0] * num_teams
+    # Students with the same feasible teams share a heap of (size, random
+    # tie breaker, team). Entries go stale when another group fills the
+    # team and are refreshed as they are popped.
+    heaps = {}
+    for i in order:
+        key = feasible[i].tobytes()
+        heap = heaps.get(key)
+        if heap is None:
+            heap = [(0, rng.random(), t)
+                    for t in np.flatnonzero(feasible[i]).tolist()]
+            heapify(heap)
+            heaps[key] = heap
+        while heap:
+            size, _, t = heap[0]
+            if size == sizes[t]:
+                break
+            heapreplace(heap, (sizes[t], rng.random(), t))
+        if not heap or heap[0][0] >= max_size:
+            msg = "Student {} can't be placed on any team."
+            raise ValueError(msg.format(i))
+        t = heap[0][2]
+        teams[i] = t
+        sizes[t] += 1
+        heapreplace(heap, (sizes[t], rng.random(), t))
+    return teams
+
+
+OptimizationResult = namedtuple('OptimizationResult',
+                                ['teams', 'score', 'team_scores',
+                                 'iterations', 'accepted'])
+
+
+def score_assignment(teams, num_teams, criteria):
+    """Returns the weighted score of every team, computed for all of the
+    teams at once."""
+    scores = np.zeros(num_teams)
+    for criterion in criteria:
+        scores += criterion.weight * criterion.team_scores(teams, num_teams)
+    return scores
+
+
+@instrument.timed('optimize')
+def optimize_teams(num_students, num_teams, criteria, initial=None,
+                   feasible=None, min_size=None, max_size=None,
+                   max_iterations=100000, time_limit=None, patience=None,
+                   seed=None):
+    """Returns an assignment of students to teams that maximizes the sum of
+    the weighted team scores, found by a swap based local search.
+
+    Each iteration proposes to either move a random student to another team
+    or swap them with a random member of that team. The proposal is accepted
+    if it keeps every student on a feasible team, keeps the team sizes within
+    bounds and does not lower the total score. Only the two teams involved
+    are rescored.
+
+    Parameters
+    ==========
+    num_students : integer
+    num_teams : integer
+    criteria : iterable
+        Criterion objects, each with a ``weight`` and ``team_score(team,
+        members)`` and ``team_scores(teams, num_teams)`` methods.
+    initial : array_like of integer, shape(num_students,), optional
+        The starting assignment, defaults to ``initial_assignment()``.
+    feasible : array_like of boolean, shape(num_students, num_teams), optional
+        True where the student may be placed on the team, see
+        ``section_feasibility()``.
+    min_size, max_size : integer, optional
+        Bounds on the team sizes, default to an even split.
+    max_iterations : integer, optional
+        The maximum number of proposals.
+    time_limit : float, optional
+        Stop after this many seconds.
+    patience : integer, optional
+        Stop after this many consecutive proposals without an improvement.
+    seed : integer, optional
+        Seeds the random proposals and the initial assignment.
+
+    Returns
+    =======
+    result : OptimizationResult
+        The final team index of each student, the mean team score, the score
+        of each team, the number of proposals made and the number accepted.
+
+    """
+    if num_teams < 1:
+        raise ValueError('At least one team is required.')
+    rng = Random(seed)
+    criteria = list(criteria)
+    if min_size is None:
+        min_size = num_students // num_teams
+    if max_size is None:
+        max_size = -(-num_students // num_teams)
+    if feasible is None:
+        feasible = np.ones((num_students, num_teams), dtype=bool)
+    feasible = np.asarray(feasible, dtype=bool)
+
+    if initial is None:
+        teams = initial_assignment(num_students, num_teams, feasible,
+                                   max_size, rng)
+    else:
+        teams = np.array(initial, dtype=int)
+
+    members = [[] for _ in range(num_teams)]
+    for i, t in enumerate(teams.tolist()):
+        members[t].append(i)
+    scores = score_assignment(teams, num_teams, criteria).tolist()
+    feasible_rows = feasible.tolist()
+
+    def team_score(t, team_members):
+        if not team_members:
+            return 0.0
+        return sum(c.weight * c.team_score(t, team_members) for c in criteria)
+
+    # with a single team there is nothing to propose, the initial assignment
+    # is the result
+    if num_teams < 2 or num_students == 0:
+        max_iterations = 0
+
+    if time_limit is not None:
+        deadline = time.perf_counter() + time_limit
+    since_improvement = 0
+    accepted = 0
+    accepted_swaps = 0
+    evaluated = 0
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        if time_limit is not None and iteration % 256 == 0:
+            if time.perf_counter() > deadline:
+                break
+        if patience is not None and since_improvement >= patience:
+            break
+        since_improvement += 1
+
+        i = rng.randrange(num_students)
+        src = teams[i]
+        dst = rng.randrange(num_teams - 1)
+        if dst >= src:
+            dst += 1
+        if not feasible_rows[i][dst]:
+            continue
+
+        src_members = [m for m in members[src] if m != i]
+        can_move = (len(members[src]) > min_size and
+                    len(members[dst]) < max_size)
+        if can_move and (not members[dst] or rng.random() < 0.5):
+            j = None
+            dst_members = members[dst] + [i]
+        elif members[dst]:
+            j = rng.choice(members[dst])
+            if not feasible_rows[j][src]:
+                continue
+            src_members.append(j)
+            dst_members = [m for m in members[dst] if m != j] + [i]
+        else:
+            continue
+
+        new_src = team_score(src, src_members)
+        new_dst = team_score(dst, dst_members)
+        evaluated += 1
+        delta = new_src + new_dst - scores[src] - scores[dst]
+        if delta >= 0:
+            if delta > 1e-12:
+                since_improvement = 0
+            accepted += 1
+            if j is not None:
+                accepted_swaps += 1
+            members[src] = src_members
+            members[dst] = dst_members
+            scores[src] = new_src
+            scores[dst] = new_dst
+            teams[i] = dst
+            if j is not None:
+                teams[j] = src
+
+    # tallied in local variables so that the loop does not pay for the
+    # instrumentation
+    instrument.count('optimize.proposals', iteration)
+    instrument.count('optimize.score_evaluations', 2 * evaluated)
+    instrument.count('optimize.accepted_moves', accepted - accepted_swaps)
+    instrument.count('optimize.accepted_swaps', accepted_swaps)
+
+    scores = np.array(scores)
+    return OptimizationResult(teams=teams, score=scores.mean(),
+                              team_scores=scores, iterations=iteration,
+                              accepted=accepted)
+
+
+MultiStartResult = namedtuple('MultiStartResult',
+                              ['best', 'seeds', 'scores'])
+
+
+def _optimize_with_seed(args):
+    num_students, num_teams, criteria, kwargs, seed = args
+    return optimize_teams(num_students, num_teams, criteria, seed=seed,
+                          **kwargs)
+
+
+def optimize_teams_multistart(num_students, num_teams, criteria,
+                              num_starts=8, workers=None, seed=None,
+                              **kwargs):
+    """Returns the best of several independently seeded runs of
+    ``optimize_teams()``, run across a pool of processes.
+
+    Parameters
+    ==========
+    num_students : integer
+    num_teams : integer
+    criteria : iterable
+        Criterion objects, these have to be picklable.
+    num_starts : integer, optional
+        The number of independent runs.
+    workers : integer, optional
+        The number of processes, defaults to the number of CPUs. If one, the
+        runs are made in this process.
+    seed : integer, optional
+        The master seed that the seed of each run is drawn from, so that the
+        whole set of runs is reproducible.
+    kwargs
+        Passed on to ``optimize_teams()``.
+
+    Returns
+    =======
+    result : MultiStartResult
+        The OptimizationResult of the best run (the earliest one on ties), the
+        seed of each run and the final score of each run.
+
+    """
+    rng = Random(seed)
+    seeds = [rng.getrandbits(32) for _ in range(num_starts)]
+    criteria = list(criteria)
+    tasks = [(num_students, num_teams, criteria, kwargs, s) for s in seeds]
+
+    if workers == 1:
+        results = [_optimize_with_seed(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_optimize_with_seed, tasks))
+
+    scores = np.array([r.score for r in results])
+    best = results[int(np.argmax(scores))]
+    return MultiStartResult(best=best, seeds=seeds, scores=scores)
+
+
+class FlowNetwork(object):
+    """A directed graph with edge capacities and costs for solving minimum
+    cost flow problems by successive shortest paths."""
+
+    def __init__(self, num_nodes):
+        self.num_nodes = num_nodes
+        self._adjacent = [[] for _ in range(num_nodes)]
+        # edge e and its residual edge e ^ 1 are stored next to each other
+        self._heads = []
+        self._capacities = []
+        self._costs = []
+
+    def add_edge(self, tail, head, capacity, cost):
+        """Adds an edge and returns its index."""
+        index = len(self._heads)
+        for u, v, cap, c in [(tail, head, capacity, cost),
+                             (head, tail, 0, -cost)]:
+            self._adjacent[u].append(len(self._heads))
+            self._heads.append(v)
+            self._capacities.append(cap)
+            self._costs.append(c)
+        return index
+
+    def flow(self, edge):
+        """Returns the flow through an edge."""
+        return self._capacities[edge ^ 1]
+
+    def cost(self, edge):
+        """Returns the cost per unit of flow of an edge."""
+        return self._costs[edge]
+
+    def _initial_potentials(self, source):
+        # Bellman-Ford (queue based) as the costs may be negative
+        potentials = [float('inf')] * self.num_nodes
+        potentials[source] = 0
+        queue = deque([source])
+        queued = [False] * self.num_nodes
+        queued[source] = True
+        while queue:
+            u = queue.popleft()
+            queued[u] = False
+            for e in self._adjacent[u]:
+                if self._capacities[e] > 0:
+                    v = self._heads[e]
+                    d = potentials[u] + self._costs[e]
+                    if d < potentials[v]:
+                        potentials[v] = d
+                        if not queued[v]:
+                            queued[v] = True
+                            queue.append(v)
+        return [0 if p == float('inf') else p for p in potentials]
+
+    def _admissible_levels(self, source, potentials):
+        """Returns the breadth first level of each node from the source using
+        only edges with remaining capacity and zero reduced cost, -1 for
+        unreachable nodes."""
+        heads, capacities, costs = self._heads, self._capacities, self._costs
+        levels = [-1] * self.num_nodes
+        levels[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            pu = potentials[u]
+            for e in self._adjacent[u]:
+                v = heads[e]
+                if (levels[v] < 0 and capacities[e] > 0 and
+                        costs[e] + pu - potentials[v] == 0):
+                    levels[v] = levels[u] + 1
+                    queue.append(v)
+        return levels
+
+    def _admissible_path(self, source, sink, levels, pointers, potentials):
+        """Returns the edges of a path from the source to the sink that goes
+        up one level per edge, or None if there is none left. The pointers
+        keep track of the edges already found to be dead ends."""
+        heads, capacities, costs = self._heads, self._capacities, self._costs
+        path = []
+        u = source
+        while u != sink:
+            adjacent = self._adjacent[u]
+            while pointers[u] < len(adjacent):
+                e = adjacent[pointers[u]]
+                v = heads[e]
+                if (capacities[e] > 0 and levels[v] == levels[u] + 1 and
+                        costs[e] + potentials[u] - potentials[v] == 0):
+                    break
+                pointers[u] += 1
+            else:
+                if u == source:
+                    return None
+                # dead end, step back and skip the edge that led here
+                e = path.pop()
+                u = heads[e ^ 1]
+                pointers[u] += 1
+                continue
+            path.append(e)
+            u = v
+        return path
+
+    def min_cost_flow(self, source, sink, max_flow=None):
+        """Sends as much flow as possible, up to max_flow, from the source to
+        the sink at the least cost and returns the (flow, cost). The graph
+        must not have negative cost cycles and the costs must be integers.
+
+        Each round finds the shortest path distances with Dijkstra on the
+        reduced costs and then saturates all of the shortest paths at once
+        with a blocking flow, so the number of rounds is bounded by the
+        number of distinct path costs rather than the amount of flow."""
+        inf = float('inf')
+        potentials = self._initial_potentials(source)
+        heads, capacities, costs = self._heads, self._capacities, self._costs
+        total_flow = 0
+        total_cost = 0
+        while max_flow is None or total_flow < max_flow:
+            # Dijkstra on the reduced costs
+            distances = [inf] * self.num_nodes
+            distances[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heappop(heap)
+                if d > distances[u]:
+                    continue
+                if u == sink:
+                    break
+                pu = potentials[u]
+                for e in self._adjacent[u]:
+                    if capacities[e] > 0:
+                        v = heads[e]
+                        nd = d + costs[e] + pu - potentials[v]
+                        if nd < distances[v]:
+                            distances[v] = nd
+                            heappush(heap, (nd, v))
+            to_sink = distances[sink]
+            if to_sink == inf:
+                break
+            # nodes not settled before the sink are at least as far away, this
+            # keeps all of the reduced costs non-negative
+            for v in range(self.num_nodes):
+                potentials[v] += min(distances[v], to_sink)
+
+            # push flow along the shortest paths, i.e. the edges with zero
+            # reduced cost, until there are none left
+            while max_flow is None or total_flow < max_flow:
+                levels = self._admissible_levels(source, potentials)
+                if levels[sink] < 0:
+                    break
+                pointers = [0] * self.num_nodes
+                while max_flow is None or total_flow < max_flow:
+                    path = self._admissible_path(source, sink, levels,
+                                                 pointers, potentials)
+                    if path is None:
+                        break
+                    amount = min(capacities[e] for e in path)
+                    if max_flow is not None:
+                        amount = min(amount, max_flow - total_flow)
+                    for e in path:
+                        capacities[e] -= amount
+                        capacities[e ^ 1] += amount
+                        total_cost += amount * costs[e]
+                    total_flow += amount
+        return total_flow, total_cost
+
+
+ProjectAssignment = namedtuple('ProjectAssignment',
+                               ['members', 'unassigned', 'cost'])
+
+
+@instrument.timed('assign.flow')
+def assign_projects(people, projects, min_size, max_size, assign_all=True,
+                    project_sections=None):
+    """Returns the assignment of people to projects that best satisfies their
+    project preferences, solved globally as a minimum cost flow.
+
+    Each person can go to any of their selected projects at a cost equal to
+    the position of the project in ``Person.selections`` (0 for the first
+    choice) but only if they can attend the project's section. Every project
+    takes at most ``max_size`` members and filling projects up to
+    ``min_size`` takes precedence over everyone getting a better choice.
+
+    Parameters
+    ==========
+    people : iterable of Person
+        The people to place, e.g. the available pool.
+    projects : iterable of Project
+        The selected projects. Members already on a project's team count
+        towards its size and the team's section is the project's section.
+    min_size : integer
+        The minimum number of people in a team.
+    max_size : integer
+        The maximum number of people in a team.
+    assign_all : boolean, optional
+        If True, people can also be placed on projects they did not select,
+        at a cost higher than any of their choices, so that nobody is left
+        out while there is room.
+    project_sections : dictionary, optional
+        The section of a project keyed by id, overriding the team's section.
+        Projects without a section can be attended by anyone.
+
+    Returns
+    =======
+    assignment : ProjectAssignment
+        The list of people placed on each project keyed by project id, the
+        list of people that could not be placed and the total cost.
+
+    """
+    people = list(people)
+    projects = list(projects)
+    if project_sections is None:
+        project_sections = {}
+    project_index = {p.id: j for j, p in enumerate(projects)}
+
+    sections = []
+    for project in projects:
+        if project.id in project_sections:
+            sections.append(project_sections[project.id])
+        elif project.team:
+            sections.append(project.team.section())
+        else:
+            sections.append(None)
+
+    # People that can attend the same sections share a node that links to
+    # the projects they did not select, instead of each person linking to
+    # every project.
+    groups = {}
+    for person in people:
+        key = (person.original_section, bool(person.willing_to_switch))
+        groups.setdefault(key, person)
+    group_index = {key: k for k, key in enumerate(groups)}
+
+    num_people = len(people)
+    first_group = num_people + len(projects)
+    source = first_group + len(groups)
+    sink = source + 1
+    network = FlowNetwork(sink + 1)
+
+    worst_cost = max([len(p.selections or []) for p in people] + [0]) + 1
+    # filling a team up to the minimum size outweighs any choice
+    fill_bonus = -(worst_cost + 1)
+
+    for j, project in enumerate(projects):
+        node = num_people + j
+        current = project.team.num_members() if project.team else 0
+        below_min = max(min_size - current, 0)
+        room = max(max_size - current, 0)
+        if below_min > 0:
+            network.add_edge(node, sink, below_min, fill_bonus)
+        if room > below_min:
+            network.add_edge(node, sink, room - below_min, 0)
+
+    group_edges = []
+    if assign_all:
+        for key, person in groups.items():
+            node = first_group + group_index[key]
+            for j in range(len(projects)):
+                if person.can_attend(sections[j]):
+                    edge = network.add_edge(node, num_people + j,
+                                            num_people, 0)
+                    group_edges.append((node, j, edge))
+
+    choice_edges = []
+    overflow_edges = []
+    for i, person in enumerate(people):
+        network.add_edge(source, i, 1, 0)
+        chosen = set()
+        for rank, proj_id in enumerate(person.selections or []):
+            j = project_index.get(proj_id)
+            if j is None or j in chosen or not person.can_attend(sections[j]):
+                continue
+            chosen.add(j)
+            edge = network.add_edge(i, num_people + j, 1, rank)
+            choice_edges.append((i, j, edge))
+        if assign_all:
+            key = (person.original_section, bool(person.willing_to_switch))
+            node = first_group + group_index[key]
+            edge = network.add_edge(i, node, 1, worst_cost)
+            overflow_edges.append((i, node, edge))
+
+    network.min_cost_flow(source, sink)
+
+    members = {p.id: [] for p in projects}
+    placed = [False] * num_people
+    cost = 0
+    for i, j, edge in choice_edges:
+        if network.flow(edge) > 0:
+            members[projects[j].id].append(people[i])
+            placed[i] = True
+            cost += network.cost(edge)
+
+    # hand out the projects the overflow nodes were routed to
+    routed = {}
+    for node, j, edge in group_edges:
+        routed.setdefault(node, []).extend([j] * network.flow(edge))
+    for i, node, edge in overflow_edges:
+        if network.flow(edge) > 0:
+            members[projects[routed[node].pop()].id].append(people[i])
+            placed[i] = True
+            cost += worst_cost
+
+    unassigned = [p for p, was_placed in zip(people, placed)
+                  if not was_placed]
+
+    return ProjectAssignment(members=members, unassigned=unassigned,
+                             cost=cost)
@@ -36,6 +36,31 @@ from docutils import core, io, nodes, readers
 
 DocumentParts = namedtuple('DocumentParts', ['metadata', 'title', 'body'])
 
+OVERRIDES = {
+    # Disable the promotion of a lone top-level section title to document
+    # title (and subsequent section title to document subtitle promotion).
+    'docinfo_xform': 0,
+    'initial_header_level': 2,
+}
+
+def read_doctree(input_string):
+    """Parse the input string as a reStructuredText document and return the
+    doctree, without rendering it.
+    """
+    return core.publish_doctree(input_string, settings_overrides=OVERRIDES)
+
+def render_html(input_string, settings_overrides=None):
+    """Render the input string as a reStructuredText document to HTML in
+    process, with the same settings as the other functions here, and return
+    the dictionary of the HTML writer's document parts, e.g. ``whole`` for
+    the full page and ``html_body`` for the body alone.
+    """
+    overrides = dict(OVERRIDES)
+    if settings_overrides is not None:
+        overrides.update(settings_overrides)
+    return core.publish_parts(input_string, writer='html',
+                              settings_overrides=overrides)
+
 def parse_document(input_string, field_names_and_parsers):
     """
     Parse the input string as a reStructuredText document and return these
@@ -52,15 +77,8 @@ def parse_document(input_string, field_names_and_parsers):
       first field list and the first-level heading unless ``False`` is passed
       passed as the value of the ``remove`` argument.
     """
-    overrides = {
-        # Disable the promotion of a lone top-level section title to document
-        # title (and subsequent section title to document subtitle promotion).
-        'docinfo_xform': 0,
-        'initial_header_level': 2,
-    }
-
     # Read tree and extract metadata.
-    doctree = core.publish_doctree(input_string, settings_overrides=overrides)
+    doctree = read_doctree(input_string)
 
     title = extract_title(doctree)
     metadata = extract_metadata(doctree, field_names_and_parsers)
@@ -71,7 +89,7 @@ def parse_document(input_string, field_names_and_parsers):
          destination_class=io.StringOutput)
     pub.set_writer('html')
     # Make ``initial_header_level`` work.
-    pub.process_programmatic_settings(None, overrides, None)
+    pub.process_programmatic_settings(None, OVERRIDES, None)
     pub.publish()
 
     return DocumentParts(
@@ -80,6 +98,21 @@ def parse_document(input_string, field_names_and_parsers):
         body=pub.writer.parts['html_body'],
     )
 
+def parse_metadata(input_string, field_names_and_parsers):
+    """
+    Like ``parse_document`` but stop once the title and the metadata have been
+    extracted from the doctree. The second docutils pass that renders the HTML
+    body is skipped and ``body`` is ``None``.
+    """
+    doctree = read_doctree(input_string)
+
+    return DocumentParts(
+        metadata=extract_metadata(doctree, field_names_and_parsers,
+                                  remove=False),
+        title=extract_title(doctree, remove=False),
+        body=None,
+    )
+
 @contextmanager
 def find_node_by_class(doctree, node_class, remove):
     """Find the first node of the specified class."""
@@ -184,10 +217,32 @@ def assert_helper(actual_obj, expected_obj, attr_name):
         'Value of attribute "%s" must be %r but is %r.' \
             % (attr_name, expected, actual)
 
+def test_parse_metadata():
+    field_names_and_parsers = {
+        'id': int,
+        'author': str,
+        'tags': lambda s: frozenset(t.strip() for t in s.split(',')),
+    }
+
+    actual = parse_metadata(TEST_INPUT, field_names_and_parsers)
+    expected = DocumentParts(
+        metadata={
+            'id': 42,
+            'author': 'John Doe',
+            'tags': frozenset(['crazy', 'plain stupid', 'unexpected']),
+        },
+        title='Example',
+        body=None,
+    )
+
+    for attr_name in 'metadata', 'title', 'body':
+        assert_helper(actual, expected, attr_name)
+
 #
 # /tests
 
 if __name__ == '__main__':
     print('Running tests ...')
     test_parse_document()
+    test_parse_metadata()
     print('alright!')
@@ -0,0 +1,389 @@
+#!/usr/bin/env python
+
+"""Runs the whole team formation from a single YAML configuration file.
+
+The pipeline is split into stages::
+
+    load -> rank -> select -> assign -> export
+
+The result of each stage is stored in the work directory along with a key
+computed from the configuration and input files it depends on. Running a
+stage reuses the stored results of the earlier stages if their key still
+matches, so e.g. re-running only the assignment while tuning does not read
+and parse the roster, survey and project files again.
+
+Usage::
+
+    python pipeline.py config.yml             # run through the export stage
+    python pipeline.py config.yml assign      # run through the assign stage
+    python pipeline.py config.yml --force     # ignore the stored results
+    python pipeline.py config.yml --profile profile.json  # time the stages
+
+An example configuration file::
+
+    roster: roster-for-team-selection.csv
+    catme: catme-data.csv
+    projects: /path/to/eme185-website/content/pages/projects
+    fixed_teams: fixed-teams.yml  # optional
+    output: project-matches.csv
+    work_dir: .teamo  # optional
+    min_team_size: 4
+    max_num_teams: 22
+    max_num_teams_per_section: 11  # optional
+    sections: [A02, A03]
+    remove_projects: [wasteconvey, aeration]  # optional
+    workers: 4  # optional, processes used to parse the projects
+
+Relative paths are relative to the configuration file.
+
+"""
+
+# builtin
+import os
+import sys
+import json
+import pickle
+import hashlib
+import argparse
+
+# external
+import yaml
+import pandas as pd
+
+# local
+import instrument
+from teamo import (rank_projects, rank_projects_weighted, populate_projects,
+                   populate_students, compute_num_teams, project_cache_path,
+                   read_catme, Team, StudentPool, EncodedStudents)
+from optimize import assign_projects
+
+STAGES = ['load', 'rank', 'select', 'assign', 'export']
+
+# the configuration entries each stage depends on
+STAGE_SETTINGS = {
+    'load': ['roster', 'catme', 'projects'],
+    'rank': [],
+    'select': ['fixed_teams', 'min_team_size', 'max_num_teams',
+               'remove_projects'],
+    'assign': ['min_team_size', 'max_num_teams_per_section', 'sections'],
+    'export': ['output'],
+}
+
+PATH_SETTINGS = ['roster', 'catme', 'projects', 'fixed_teams', 'output',
+                 'work_dir']
+
+
+def load_config(path):
+    """Returns the configuration dictionary with relative paths resolved
+    against the configuration file's directory."""
+    with open(path, 'r') as f:
+        config = yaml.safe_load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    config.setdefault('work_dir', '.teamo')
+    config.setdefault('remove_projects', [])
+    config.setdefault('sections', ['A02', 'A03'])
+    for key in PATH_SETTINGS:
+        if config.get(key) is not None:
+            config[key] = os.path.join(base, os.path.expanduser(config[key]))
+    return config
+
+
+def _file_fingerprint(path):
+    """Returns the modification times and sizes of a file or of the files in
+    a directory."""
+    if path is None:
+        return None
+    if os.path.isdir(path):
+        return [_file_fingerprint(os.path.join(path, f))
+                for f in sorted(os.listdir(path))]
+    stat = os.stat(path)
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+
+class Pipeline(object):
+    """Runs the stages of the team formation and stores their results."""
+
+    def __init__(self, config, force=False):
+        """
+        Parameters
+        ==========
+        config : dictionary
+            See ``load_config()``.
+        force : boolean, optional
+            If True, stored results are ignored and every stage runs.
+
+        """
+        self.config = config
+        self.force = force
+        self.work_dir = config['work_dir']
+        self._results = {}
+        self._keys = {}
+
+    def stage_key(self, stage):
+        """Returns the key identifying a stage's result, which changes if
+        any of its settings, input files or earlier stages change."""
+        if stage in self._keys:
+            return self._keys[stage]
+        index = STAGES.index(stage)
+        settings = {k: self.config.get(k) for k in STAGE_SETTINGS[stage]}
+        inputs = {}
+        if stage == 'load':
+            inputs = {k: _file_fingerprint(self.config.get(k))
+                      for k in ['roster', 'catme', 'projects']}
+        elif stage == 'select':
+            inputs = _file_fingerprint(self.config.get('fixed_teams'))
+        upstream = self.stage_key(STAGES[index - 1]) if index > 0 else None
+        data = json.dumps([stage, settings, inputs, upstream],
+                          sort_keys=True, default=str)
+        key = hashlib.sha1(data.encode('utf-8')).hexdigest()
+        self._keys[stage] = key
+        return key
+
+    def _result_path(self, stage):
+        return os.path.join(self.work_dir, '{}.pickle'.format(stage))
+
+    def _load_result(self, stage):
+        try:
+            with open(self._result_path(stage), 'rb') as f:
+                key, result = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if key != self.stage_key(stage):
+            return None
+        return result
+
+    def _save_result(self, stage, result):
+        os.makedirs(self.work_dir, exist_ok=True)
+        with open(self._result_path(stage), 'wb') as f:
+            pickle.dump((self.stage_key(stage), result), f)
+
+    def result(self, stage, run=False):
+        """Returns the result of a stage, loading the stored result if it is
+        current or else running the stage.
+
+        Parameters
+        ==========
+        stage : string
+            One of STAGES.
+        run : boolean, optional
+            If True, the stage is run even if a stored result is current.
+            Earlier stages are still reused.
+
+        """
+        if stage in self._results:
+            return self._results[stage]
+        result = None
+        if not (run or self.force):
+            result = self._load_result(stage)
+        if result is None:
+            with instrument.stage(stage):
+                result = getattr(self, 'run_' + stage)()
+            self._save_result(stage, result)
+        else:
+            instrument.count('stages.reused')
+            print('Using the stored result of the {} stage.'.format(stage))
+        self._results[stage] = result
+        return result
+
+    def run(self, last_stage=None):
+        """Runs the stages up to and including the last stage. The last
+        stage always runs while the earlier stages are reused if their
+        stored results are current."""
+        if last_stage is None:
+            last_stage = STAGES[-1]
+        for stage in STAGES[:STAGES.index(last_stage) + 1]:
+            self.result(stage, run=stage == last_stage)
+        return self._results[last_stage]
+
+    def run_load(self):
+        config = self.config
+        roster = pd.read_csv(config['roster'])
+        catme = read_catme(config['catme'])
+        students = populate_students(roster, catme)
+        projects = populate_projects(
+            config['projects'], workers=config.get('workers'),
+            cache_path=project_cache_path(config['projects']))
+        return {'students': students,
+                'projects': projects,
+                'names': list(roster['Name']),
+                'sections': dict(zip(roster['Name'], roster['Section']))}
+
+    def run_rank(self):
+        loaded = self.result('load')
+        students, projects = loaded['students'], loaded['projects']
+        # encoded once for both tallies
+        encoded = EncodedStudents(students.values())
+        votes = rank_projects(encoded, projects)
+        rankings = rank_projects_weighted(encoded, projects)
+        print('Raw Project Rankings:')
+        print(votes)
+        print('Weighted Project Rankings:')
+        print(rankings)
+        return {'votes': votes, 'rankings': rankings}
+
+    def run_select(self):
+        config = self.config
+        loaded = self.result('load')
+        students, projects = loaded['students'], loaded['projects']
+        rankings = self.result('rank')['rankings']
+
+        min_size = config['min_team_size']
+        num_teams, max_in_team, num_larger_teams = compute_num_teams(
+            len(students), min_size, config['max_num_teams'])
+        msg = 'There will be {} teams of {} and {} teams of {}.'
+        print(msg.format(num_teams - num_larger_teams, min_size,
+                         num_larger_teams, min_size + 1))
+
+        fixed_teams = {}
+        if config.get('fixed_teams'):
+            with open(config['fixed_teams'], 'r') as f:
+                fixed_teams = yaml.safe_load(f) or {}
+
+        fixed_ids = list(fixed_teams)
+        excluded = fixed_ids + list(config['remove_projects'])
+        remaining = rankings.iloc[~rankings.index.isin(excluded)]
+        selected_ids = list(remaining.sort_values('votes').
+                            tail(num_teams - len(fixed_ids)).index)
+        votes = rankings['votes'].reindex(selected_ids + fixed_ids)
+        selected_ids = list(votes.fillna(0).sort_values(ascending=False).
+                            index)
+
+        print('Selected projects:')
+        for i, proj_id in enumerate(selected_ids):
+            print(i + 1, proj_id)
+
+        return {'selected': selected_ids,
+                'fixed_teams': fixed_teams,
+                'max_in_team': max_in_team}
+
+    def _project_sections(self, students, selected, fixed_teams):
+        """Returns the section of each selected project. Projects with a
+        fixed team meet in the team's section and the rest are spread over
+        the sections in proportion to the students registered in each, most
+        popular project first."""
+        config = self.config
+        sections = list(config['sections'])
+        max_per_section = config.get('max_num_teams_per_section')
+
+        project_sections = {}
+        counts = dict.fromkeys(sections, 0)
+        for proj_id, team in fixed_teams.items():
+            project_sections[proj_id] = team.section()
+            if team.section() in counts:
+                counts[team.section()] += 1
+
+        registered = dict.fromkeys(sections, 0)
+        for person in students.values():
+            if person.original_section in registered:
+                registered[person.original_section] += 1
+        total = max(sum(registered.values()), 1)
+
+        for proj_id in selected:
+            if proj_id in project_sections:
+                continue
+            num_assigned = sum(counts.values()) + 1
+            open_sections = [s for s in sections if max_per_section is None
+                             or counts[s] < max_per_section]
+            if not open_sections:
+                open_sections = sections
+            # the section furthest below its share of the teams
+            section = max(open_sections, key=lambda s: (
+                registered[s] / total * num_assigned - counts[s]))
+            project_sections[proj_id] = section
+            counts[section] += 1
+        return project_sections
+
+    def run_assign(self):
+        config = self.config
+        loaded = self.result('load')
+        students, projects = loaded['students'], loaded['projects']
+        selection = self.result('select')
+        selected = selection['selected']
+
+        pool = StudentPool(students[n] for n in loaded['names'])
+
+        # for students that didn't fill out the survey give them the five
+        # least popular of the selected projects and keep them in the
+        # section they are registered in
+        for person in pool:
+            if not person.selections:
+                person.selections = list(reversed(selected))[:5]
+            if person.original_section is None:
+                person.original_section = loaded['sections'][person.name]
+
+        fixed_teams = {}
+        for proj_id, members in selection['fixed_teams'].items():
+            fixed_teams[proj_id] = Team([students[m] for m in members])
+            for member in members:
+                pool.remove(students[member])
+
+        project_sections = self._project_sections(students, selected,
+                                                  fixed_teams)
+        teams = {}
+        for proj_id in selected:
+            team = fixed_teams.get(proj_id)
+            if team is None:
+                team = Team(section=project_sections[proj_id])
+            teams[proj_id] = team
+            projects[proj_id].team = team
+
+        assignment = assign_projects(pool, [projects[p] for p in selected],
+                                     config['min_team_size'],
+                                     selection['max_in_team'],
+                                     project_sections=project_sections)
+        for proj_id, members in assignment.members.items():
+            for member in members:
+                teams[proj_id].add_member(member)
+
+        for proj_id in selected:
+            print(projects[proj_id])
+        print('Remaining: {}'.format(len(assignment.unassigned)))
+        for person in assignment.unassigned:
+            print(person)
+
+        return {'teams': teams, 'unassigned': assignment.unassigned}
+
+    def run_export(self):
+        teams = self.result('assign')['teams']
+        names, project_ids, sections = [], [], []
+        for proj_id, team in teams.items():
+            for person in team.members:
+                names.append(person.name)
+                project_ids.append(proj_id)
+                sections.append(team.section())
+        matches = pd.DataFrame({'Project': project_ids,
+                                'Section': sections},
+                               index=names).sort_index()
+        matches.to_csv(self.config['output'])
+        print('Wrote {}'.format(self.config['output']))
+        return matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Form project teams from a configuration file.')
+    parser.add_argument('config', help='path to the YAML configuration file')
+    parser.add_argument('stage', nargs='?', choices=STAGES,
+                        default=STAGES[-1],
+                        help='the last stage to run (default: export)')
+    parser.add_argument('--force', action='store_true',
+                        help='ignore all stored results')
+    parser.add_argument('--profile', metavar='PATH',
+                        help='write the time spent in each stage and the '
+                        'search counters to this JSON file')
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        instrument.enable()
+    try:
+        pipeline = Pipeline(load_config(args.config), force=args.force)
+        pipeline.run(args.stage)
+    finally:
+        if args.profile:
+            instrument.disable()
+            instrument.dump(args.profile)
+            print(instrument.RECORDER.summary())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
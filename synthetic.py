@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+"""Generates synthetic class rosters, CATME survey exports and project
+directories for testing and benchmarking at any scale."""
+
+# builtin
+import os
+from collections import namedtuple
+
+# external
+import numpy as np
+import pandas as pd
+
+# local
+from teamo import CHOICE_COLUMNS
+
+GENDERS = ['Male', 'Female', 'Other/Prefer not to answer']
+GENDER_WEIGHTS = [0.75, 0.22, 0.03]
+RACES = ['White', 'Asian', 'Hispanic or Latino', 'Black or African American',
+         'Other/Prefer not to answer']
+RACE_WEIGHTS = [0.4, 0.3, 0.2, 0.05, 0.05]
+SKILLS = ['CAD', 'welding', 'machining', 'electronics', 'programming',
+          'fluids', 'controls', 'materials', 'thermodynamics', 'design']
+
+PROJECT_RST = """\
+{title}
+{underline}
+
+:id: {id}
+:title: {title}
+:org: {org}
+:org_url: http://www.example.com/{id}
+:skills: {skills}
+:location: Davis, CA
+:status: Accepted
+:template: project
+
+Design a better {id} for {org}. The students will interview the sponsor,
+write a specification, generate concepts and build a prototype.
+"""
+
+SyntheticCohort = namedtuple('SyntheticCohort',
+                             ['roster', 'catme', 'project_dir',
+                              'project_ids'])
+
+
+def generate_project_ids(num_projects):
+    """Returns a list of unique project ids."""
+    return ['proj{:05d}'.format(i) for i in range(num_projects)]
+
+
+def generate_projects(project_dir, project_ids, seed=None):
+    """Writes a Pelican rst file for each project into the directory."""
+    rng = np.random.default_rng(seed)
+    if not os.path.isdir(project_dir):
+        os.makedirs(project_dir)
+    for proj_id in project_ids:
+        title = 'The {} Project'.format(proj_id.capitalize())
+        skills = rng.choice(SKILLS, size=3, replace=False)
+        with open(os.path.join(project_dir, proj_id + '.rst'), 'w') as f:
+            f.write(PROJECT_RST.format(title=title, id=proj_id,
+                                       underline='=' * len(title),
+                                       org='Org {}'.format(proj_id[-3:]),
+                                       skills=', '.join(skills)))
+
+
+def _ranked_choices(rng, num_students, popularity, num_choices,
+                    chunk_size=2000):
+    """Returns a (num_students, num_choices) array of project indices drawn
+    without replacement in proportion to their popularity."""
+    log_weights = np.log(popularity)
+    choices = np.empty((num_students, num_choices), dtype=int)
+    # perturbing the log weights with Gumbel noise and taking the top k is
+    # the same as drawing k without replacement
+    for start in range(0, num_students, chunk_size):
+        stop = min(start + chunk_size, num_students)
+        keys = log_weights + rng.gumbel(size=(stop - start,
+                                              len(popularity)))
+        top = np.argpartition(-keys, num_choices - 1,
+                              axis=1)[:, :num_choices]
+        order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+        choices[start:stop] = np.take_along_axis(top, order, axis=1)
+    return choices
+
+
+def generate_survey(num_students, project_ids, num_choices=5,
+                    sections=('A02', 'A03'), response_rate=0.95,
+                    switch_rate=0.5, popularity_exponent=1.0, seed=None):
+    """Returns a roster and a CATME export of a synthetic class.
+
+    Parameters
+    ==========
+    num_students : integer
+        The number of students in the roster.
+    project_ids : sequence of string
+        The projects the students choose from.
+    num_choices : integer, optional
+        The number of ranked project choices.
+    sections : sequence of string, optional
+        The studio sections.
+    response_rate : float, optional
+        The fraction of the students that filled out the survey.
+    switch_rate : float, optional
+        The fraction of the respondents willing to switch sections.
+    popularity_exponent : float, optional
+        The projects' popularity follows a Zipf law with this exponent, zero
+        makes all projects equally popular.
+    seed : integer, optional
+
+    Returns
+    =======
+    roster : pandas.DataFrame
+        Columns: Name, ID, Email, Section
+    catme : pandas.DataFrame
+        Columns: Name, Student ID, Email, Studio Section, Studio Switch, Sex,
+        Race, GPA and the project choice columns.
+
+    """
+    rng = np.random.default_rng(seed)
+    num_choices = min(num_choices, len(project_ids))
+
+    ids = np.arange(1, num_students + 1) + 900000000
+    names = ['Last{0}, First{0}'.format(i) for i in range(num_students)]
+    emails = ['student{}@example.com'.format(i) for i in range(num_students)]
+    section = np.asarray(sections)[rng.integers(len(sections),
+                                                size=num_students)]
+    roster = pd.DataFrame({'Name': names, 'ID': ids, 'Email': emails,
+                           'Section': section})
+
+    responded = np.flatnonzero(rng.random(num_students) < response_rate)
+    num_responses = len(responded)
+    popularity = 1.0 / np.arange(1, len(project_ids) + 1) ** \
+        popularity_exponent
+    popularity = rng.permutation(popularity)
+    choices = np.asarray(project_ids)[
+        _ranked_choices(rng, num_responses, popularity, num_choices)]
+
+    catme = pd.DataFrame({
+        'Name': [names[i] for i in responded],
+        'Student ID': ids[responded],
+        'Email': [emails[i] for i in responded],
+        'Studio Section': section[responded],
+        'Studio Switch': np.where(rng.random(num_responses) < switch_rate,
+                                  'Yes', 'No'),
+        'Sex': rng.choice(GENDERS, size=num_responses, p=GENDER_WEIGHTS),
+        'Race': rng.choice(RACES, size=num_responses, p=RACE_WEIGHTS),
+        'GPA': np.round(np.clip(rng.normal(3.1, 0.4, num_responses), 2.0,
+                                4.0), 2),
+    })
+    for k, col in enumerate(CHOICE_COLUMNS[:num_choices]):
+        catme[col] = choices[:, k]
+    for col in CHOICE_COLUMNS[num_choices:]:
+        catme[col] = np.nan
+    # the survey rows are not in roster order
+    catme = catme.sample(frac=1.0, random_state=rng.integers(2**31)).\
+        reset_index(drop=True)
+
+    return roster, catme
+
+
+def generate_cohort(directory, num_students=100, num_projects=10, seed=None,
+                    **kwargs):
+    """Writes a synthetic roster, CATME export and project directory.
+
+    Parameters
+    ==========
+    directory : string
+        Where to write ``roster.csv``, ``catme-data.csv`` and the
+        ``projects`` directory.
+    num_students : integer, optional
+    num_projects : integer, optional
+    seed : integer, optional
+    kwargs
+        Passed on to ``generate_survey()``.
+
+    Returns
+    =======
+    cohort : SyntheticCohort
+        The paths to the roster, CATME export and project directory and the
+        list of project ids.
+
+    """
+    project_ids = generate_project_ids(num_projects)
+    roster, catme = generate_survey(num_students, project_ids, seed=seed,
+                                    **kwargs)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    roster_path = os.path.join(directory, 'roster.csv')
+    catme_path = os.path.join(directory, 'catme-data.csv')
+    project_dir = os.path.join(directory, 'projects')
+    roster.to_csv(roster_path, index=False)
+    catme.to_csv(catme_path, index=False)
+    generate_projects(project_dir, project_ids, seed=seed)
+    return SyntheticCohort(roster=roster_path, catme=catme_path,
+                           project_dir=project_dir, project_ids=project_ids)
@@ -0,0 +1,537 @@
+#!/usr/bin/env python
+
+"""Generates the emails that announce the teams to the students and sponsors
+and let the sponsors of the proposals that were not selected know.
+
+The students table is the CATME export with the team assignment added, with
+the columns: Name ("Last, First"), Email, Project ID, Project Section,
+Switched, TA and optionally TA Email.
+
+The sponsors table has a row per proposal with the columns: ID, Email, Phone
+Number, Organization, Accepted ("Yes" or "No"), either Name or First Name and
+Last Name, and either Title or Project Title.
+
+Both tables are indexed once and the students are grouped by project in a
+single pass, so generating the emails is linear in the number of students.
+
+Every email is rendered to its own HTML file in process with docutils, across
+a pool of processes if asked to, and an index page links to all of them. A
+malformed email is reported without stopping the others.
+
+Usage::
+
+    python team_emails.py catme-data-with-teams.csv sponsors.csv emails/
+    python team_emails.py catme-data-with-teams.csv sponsors.csv emails/ \
+        --workers 4
+    python team_emails.py catme-data-with-teams.csv sponsors.csv emails/ \
+        --ta-email "Lyons, Ken=kmlyons@ucdavis.edu" \
+        --ta-email "Gary Chen=gchen@ucdavis.edu"
+
+The ``--ta-email`` options give the TAs' addresses when the students table
+has no TA Email column.
+
+"""
+
+# builtin
+import os
+import re
+import sys
+import html
+import argparse
+import datetime
+from collections import namedtuple
+
+# external
+import pandas as pd
+
+ACCEPTANCE_SUBJECT = 'EME 185 Project Selection Announcement'
+
+ACCEPTANCE_TEMPLATE = """\
+{project_title}
+{underline}
+
+| {subject}
+| {student_emails}
+| {sponsor_email},{ta_email}
+
+Dear {first_names},
+
+You have been selected to work on the project entitled **{project_title}** for
+EME185A/B in **Section {team_section}**. Your teammates are:
+{team_contact_list}
+
+We have done our best to place you on a compatible team and give you at least
+one of your project choices.
+
+Your TA consultant is {ta_name} [{ta_email}]. The sponsor for this project is
+{sponsor_name} from {organization}. You can contact the sponsor by email,
+{sponsor_email}, or phone, {sponsor_phone}. You should delegate a team member
+to get in touch with your sponsor as soon as possible. An initial interview is
+crucial for this week's assignments.
+
+Your team should respect the sponsors' time and treat them professionally. They
+have agreed to meet with you up to one hour per week through the duration of
+the course. They are volunteering their time, expertise, resources, and money
+for your educational experience. Keep in mind that developing a great
+relationship with them will likely benefit your career.
+
+A handful of students will need to attend the other studio section this week
+due to the team assignment. Please, see the section listed above for your team.
+**If your name has a * beside it you need to switch sections.** You do not need
+to change your section registration with the University.
+
+Sincerely,
+
+"""
+
+SPONSOR_SUBJECT = 'UCD MAE Capstone Proposal Selection: {project_title}'
+
+REJECTION_TEMPLATE = """\
+{project_title}
+{underline}
+
+| {subject}
+| {sponsor_email}
+
+Dear {sponsor_name},
+
+I am writing to inform you that your proposal for the {year} UCD MAE Mechanical
+Capstone Course, {project_title}, was not selected for this year's course. We
+accepted {num_accepted} of {num_proposals} proposals for teams of \
+{min_team_size} to {max_team_size} students. Your proposal did not
+receive enough votes from the students to ensure we would have enough team
+members on the project.
+
+The department and I value your participation and hope that you will consider
+being involved in the future. If you desire, I would love to roll over your
+project to next year and would be happy to help you make your proposal more
+attractive to the students. I will also keep you on our announcement list for
+future years unless you request otherwise.
+
+Once again, we are very grateful for your proposal and your support of the
+program. Let me know if you have any questions.
+
+Sincerely,
+
+"""
+
+FUNDING_TEMPLATE = """\
+{project_title}
+{underline}
+
+| {subject}
+| {sponsor_email}
+
+Dear {sponsor_name},
+
+Now that the teams are assigned and you have had a chance to meet the students
+I would like to check in about the project funding. As a reminder, my only hard
+requirement for the class is that students create a design "on paper". But I
+also encourage the students to build prototypes for a more enriching learning
+experience, which many of them do. Mechanical prototypes, of course, cost
+money to construct and primarily we rely on the project sponsors to support
+this. We try to support a variety of projects from industry, the non-profit
+sector, and research with limited funding.
+
+1. The organization provides employee time to meet with the students regularly
+   for feedback and/or technical mentorship over the 5+ month period.
+2. If the organization desires a physical prototype they cover the costs for
+   materials and resources that are outside the scope of what we provide at the
+   University.
+3. If a site visit is required from a distant company, the company supports the
+   visit.
+4. Finally, we request that organizations donate $3k to the program as an
+   "in-kind" donation which will be used for our general funds to support all
+   of the projects. We will accept a sliding scale here if this is a financial
+   burden.
+
+The students will soon be preparing a proposal and preliminary budget.
+
+I need some information from each of you:
+
+1. Will you be funding a physical prototype if the students' proposed design is
+   approved? If so, how much will you provide?
+2. Will you be handling purchasing and/or reimbursements for you students, or
+   do you want to use UCD's system?
+
+Sincerely,
+
+"""
+
+TeamEmail = namedtuple('TeamEmail', ['kind', 'project_id', 'subject',
+                                     'recipients', 'rst'])
+
+
+def _first_last(name):
+    """Returns "First Last" for a name given as "Last, First"."""
+    if ', ' in name:
+        last, first = name.split(', ', 1)
+        return first + ' ' + last
+    return name
+
+
+def _first_name(name):
+    """Returns "First" for a name given as "Last, First"."""
+    return name.split(', ', 1)[1] if ', ' in name else name
+
+
+def index_sponsors(sponsors):
+    """Returns a dictionary of the sponsor entries keyed by project id, each a
+    dictionary with the keys: name, organization, email, phone, title and
+    accepted. The first row of a repeated id is used."""
+    sponsors = sponsors.drop_duplicates('ID')
+    if 'Name' in sponsors.columns:
+        names = sponsors['Name']
+    else:
+        names = sponsors['First Name'] + ' ' + sponsors['Last Name']
+    if 'Title' in sponsors.columns:
+        titles = sponsors['Title']
+    else:
+        titles = sponsors['Project Title']
+    index = {}
+    for row in zip(sponsors['ID'], names, sponsors['Organization'],
+                   sponsors['Email'], sponsors['Phone Number'], titles,
+                   sponsors['Accepted']):
+        index[row[0]] = dict(zip(['name', 'organization', 'email', 'phone',
+                                  'title', 'accepted'], row[1:]))
+    return index
+
+
+def group_students(students):
+    """Returns a list of (project id, team) with the team a DataFrame of the
+    students on the project, in the order the projects first appear."""
+    return list(students.groupby('Project ID', sort=False))
+
+
+def _sponsor(sponsors, project_id):
+    try:
+        return sponsors[project_id]
+    except KeyError:
+        msg = "There is no sponsor entry for the project '{}'."
+        raise ValueError(msg.format(project_id))
+
+
+def _ta_email(team, ta_name, ta_emails):
+    if 'TA Email' in team.columns and not pd.isnull(team['TA Email'].iloc[0]):
+        return team['TA Email'].iloc[0]
+    try:
+        return ta_emails[ta_name]
+    except KeyError:
+        msg = "There is no TA Email column or email given for {}."
+        raise ValueError(msg.format(ta_name))
+
+
+def acceptance_emails(students, sponsors, ta_emails=None, teams=None):
+    """Returns a TeamEmail for each team introducing the team members to each
+    other, their TA and their sponsor.
+
+    Parameters
+    ==========
+    students : pandas.DataFrame
+        The CATME export with the team assignment, see the module docstring.
+    sponsors : pandas.DataFrame or dictionary
+        The sponsors table or its ``index_sponsors()``.
+    ta_emails : dictionary, optional
+        The email of each TA keyed by name ("First Last"), used if the
+        students table has no TA Email column.
+    teams : list, optional
+        The ``group_students()`` of the students table.
+
+    """
+    if not isinstance(sponsors, dict):
+        sponsors = index_sponsors(sponsors)
+    if teams is None:
+        teams = group_students(students)
+    if ta_emails is None:
+        ta_emails = {}
+
+    emails = []
+    for project_id, team in teams:
+        sponsor = _sponsor(sponsors, project_id)
+        names = team['Name'].tolist()
+        switched = [not pd.isnull(s) and bool(s) for s in team['Switched']]
+        ta_name = _first_last(team['TA'].iloc[0])
+        ta_email = _ta_email(team, ta_name, ta_emails)
+        addresses = []
+        contacts = []
+        for name, address, s in zip(names, team['Email'], switched):
+            # a student without an address is listed but not emailed
+            if pd.isnull(address) or not str(address).strip():
+                print('{} on team {} has no email address.'.format(
+                    name, project_id))
+                contacts.append('{}{}'.format(name, '*' if s else ''))
+                continue
+            address = str(address).strip()
+            addresses.append(address)
+            contacts.append('{} [{}]{}'.format(name, address,
+                                               '*' if s else ''))
+        data = {
+            'subject': ACCEPTANCE_SUBJECT,
+            'sponsor_name': sponsor['name'],
+            'organization': sponsor['organization'],
+            'sponsor_email': sponsor['email'],
+            'sponsor_phone': sponsor['phone'],
+            'student_emails': ','.join(addresses),
+            'first_names': ', '.join(_first_name(n) for n in names),
+            'project_title': sponsor['title'],
+            'underline': '=' * len(sponsor['title']),
+            'team_section': team['Project Section'].iloc[0],
+            'team_contact_list': '\n- ' + '\n- '.join(contacts),
+            'ta_name': ta_name,
+            'ta_email': ta_email,
+        }
+        emails.append(TeamEmail(
+            kind='acceptance', project_id=project_id,
+            subject=ACCEPTANCE_SUBJECT,
+            recipients=addresses + [sponsor['email'], ta_email],
+            rst=ACCEPTANCE_TEMPLATE.format(**data)))
+    return emails
+
+
+def _sponsor_email(kind, template, project_id, sponsor, **extra):
+    subject = SPONSOR_SUBJECT.format(project_title=sponsor['title'])
+    data = dict(subject=subject, sponsor_name=sponsor['name'],
+                sponsor_email=sponsor['email'],
+                project_title=sponsor['title'],
+                underline='=' * len(sponsor['title']), **extra)
+    return TeamEmail(kind=kind, project_id=project_id, subject=subject,
+                     recipients=[sponsor['email']],
+                     rst=template.format(**data))
+
+
+def rejection_emails(students, sponsors, year=None, teams=None):
+    """Returns a TeamEmail for the sponsor of each proposal that is marked as
+    not accepted in the sponsors table.
+
+    Parameters
+    ==========
+    students : pandas.DataFrame
+        The CATME export with the team assignment, used to tell the number of
+        accepted proposals and the team sizes.
+    sponsors : pandas.DataFrame or dictionary
+        The sponsors table or its ``index_sponsors()``.
+    year : integer, optional
+        The year of the course, defaults to the current year.
+    teams : list, optional
+        The ``group_students()`` of the students table.
+
+    """
+    if not isinstance(sponsors, dict):
+        sponsors = index_sponsors(sponsors)
+    if teams is None:
+        teams = group_students(students)
+    if year is None:
+        year = datetime.date.today().year
+    sizes = [len(team) for project_id, team in teams] or [0]
+    return [_sponsor_email('rejection', REJECTION_TEMPLATE, project_id,
+                           sponsor, year=year, num_accepted=len(teams),
+                           num_proposals=len(sponsors),
+                           min_team_size=min(sizes),
+                           max_team_size=max(sizes))
+            for project_id, sponsor in sponsors.items()
+            if sponsor['accepted'] == 'No']
+
+
+def funding_emails(students, sponsors, teams=None):
+    """Returns a TeamEmail asking the sponsor of each team about the project
+    funding."""
+    if not isinstance(sponsors, dict):
+        sponsors = index_sponsors(sponsors)
+    if teams is None:
+        teams = group_students(students)
+    return [_sponsor_email('funding', FUNDING_TEMPLATE, project_id,
+                           _sponsor(sponsors, project_id))
+            for project_id, team in teams]
+
+
+def generate_emails(students, sponsors, ta_emails=None, year=None):
+    """Returns a dictionary of the lists of acceptance, rejection and funding
+    emails, indexing the tables once for all of them."""
+    sponsors = index_sponsors(sponsors)
+    teams = group_students(students)
+    return {
+        'acceptance': acceptance_emails(students, sponsors, ta_emails,
+                                        teams),
+        'rejection': rejection_emails(students, sponsors, year, teams),
+        'funding': funding_emails(students, sponsors, teams),
+    }
+
+
+# errors in an email raise instead of being rendered into the page or
+# printed, so that they can be reported with the others
+RENDER_SETTINGS = {
+    'halt_level': 3,
+    'report_level': 5,
+    'warning_stream': False,
+}
+
+PAGE_TEMPLATE = """\
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8" />
+<title>{title}</title>
+{stylesheet}
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+RenderedEmails = namedtuple('RenderedEmails', ['paths', 'failed', 'index'])
+
+
+def _render(rst):
+    """Returns the HTML parts of an email and None or None and the error
+    message if it can't be rendered."""
+    from docutils import ApplicationError
+    from parse_rst import render_html
+    try:
+        parts = render_html(rst, RENDER_SETTINGS)
+    except ApplicationError as error:
+        return None, str(error)
+    return {k: parts[k] for k in ['whole', 'html_body', 'stylesheet']}, None
+
+
+def email_filename(email):
+    """Returns the name of the HTML file of an email."""
+    project_id = re.sub(r'[^\w.-]+', '_', str(email.project_id))
+    return '{}-{}.html'.format(email.kind, project_id)
+
+
+def render_emails(emails, out_dir, workers=None):
+    """Renders each email to its own HTML file, a page per kind of email with
+    all of them for reading through, and an ``index.html`` linking to
+    everything.
+
+    Parameters
+    ==========
+    emails : iterable of TeamEmail
+    out_dir : string
+        The directory to write the files to.
+    workers : integer, optional
+        If greater than one, the emails are rendered across a pool of this
+        many processes.
+
+    Returns
+    =======
+    rendered : RenderedEmails
+        The path of each email's file, None if it failed, a list of
+        (email, error message) of the failed emails and the index's path.
+
+    """
+    emails = list(emails)
+    rsts = [email.rst for email in emails]
+    if workers is not None and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(rsts) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render, rsts, chunksize=chunksize))
+    else:
+        results = [_render(rst) for rst in rsts]
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    failed = []
+    kinds = {}
+    stylesheet = ''
+    for email, (parts, error) in zip(emails, results):
+        kinds.setdefault(email.kind, [])
+        if parts is None:
+            paths.append(None)
+            failed.append((email, error))
+            continue
+        path = os.path.join(out_dir, email_filename(email))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(parts['whole'])
+        paths.append(path)
+        kinds[email.kind].append((email, parts))
+        stylesheet = parts['stylesheet']
+
+    lines = []
+    for kind, rendered in kinds.items():
+        page = '{}-emails.html'.format(kind)
+        with open(os.path.join(out_dir, page), 'w', encoding='utf-8') as f:
+            f.write(PAGE_TEMPLATE.format(
+                title='{} emails'.format(kind.capitalize()),
+                stylesheet=stylesheet,
+                body='<hr />\n'.join(p['html_body'] for e, p in rendered)))
+        lines.append('<h2><a href="{}">{} emails</a></h2>'.format(
+            page, kind.capitalize()))
+        lines.append('<ul>')
+        for email, parts in rendered:
+            lines.append('<li><a href="{}">{}</a>: {}</li>'.format(
+                email_filename(email), html.escape(email.subject),
+                html.escape(', '.join(email.recipients))))
+        lines.append('</ul>')
+    if failed:
+        lines.append('<h2>Failed</h2>')
+        lines.append('<ul>')
+        for email, error in failed:
+            lines.append('<li>{} {}: <pre>{}</pre></li>'.format(
+                email.kind, html.escape(str(email.project_id)),
+                html.escape(error)))
+        lines.append('</ul>')
+    index = os.path.join(out_dir, 'index.html')
+    with open(index, 'w', encoding='utf-8') as f:
+        f.write(PAGE_TEMPLATE.format(title='Emails', stylesheet=stylesheet,
+                                     body='\n'.join(lines)))
+
+    return RenderedEmails(paths=paths, failed=failed, index=index)
+
+
+def write_rst(emails, path):
+    """Writes the emails into a single reStructuredText file."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for email in emails:
+            f.write(email.rst)
+
+
+def parse_ta_email(value):
+    """Returns the ("First Last", address) of a TA given as NAME=ADDRESS on
+    the command line, where the name can also be "Last, First"."""
+    name, sep, address = value.partition('=')
+    if not sep or not name.strip() or not address.strip():
+        msg = 'Expected NAME=ADDRESS, got {!r}.'
+        raise argparse.ArgumentTypeError(msg.format(value))
+    return _first_last(name.strip()), address.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Generate the team announcement and proposal emails.')
+    parser.add_argument('students',
+                        help='the CATME export with the team assignment')
+    parser.add_argument('sponsors', help='the sponsors table')
+    parser.add_argument('out_dir', help='where to write the emails')
+    parser.add_argument('--year', type=int,
+                        help='the year of the course (default: this year)')
+    parser.add_argument('--workers', type=int,
+                        help='render the emails across this many processes')
+    parser.add_argument('--ta-email', action='append', type=parse_ta_email,
+                        default=[], metavar='NAME=ADDRESS',
+                        help="a TA's email address, can be repeated")
+    args = parser.parse_args(argv)
+
+    emails = generate_emails(pd.read_csv(args.students),
+                             pd.read_csv(args.sponsors),
+                             ta_emails=dict(args.ta_email), year=args.year)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for kind, kind_emails in emails.items():
+        path = os.path.join(args.out_dir, '{}-emails.rst'.format(kind))
+        write_rst(kind_emails, path)
+
+    all_emails = [e for kind_emails in emails.values() for e in kind_emails]
+    rendered = render_emails(all_emails, args.out_dir, workers=args.workers)
+    print('Rendered {} emails, see {}'.format(
+        len(all_emails) - len(rendered.failed), rendered.index))
+    for email, error in rendered.failed:
+        print('Failed to render the {} email of {}:'.format(
+            email.kind, email.project_id))
+        print(error)
+    return 1 if rendered.failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
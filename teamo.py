@@ -2,14 +2,35 @@
 
 # builtin
 import os
+import json
+import hashlib
+import importlib
 from random import choice
-from collections import Counter, defaultdict
-
-# external
-import pandas as pd
+from collections import Counter
 
 # local
-from parse_rst import parse_document
+import instrument
+
+
+class _LazyModule(object):
+    """Stands in for a module in this module's namespace until one of its
+    attributes is used, then imports the module and replaces itself with it.
+    This keeps ``import teamo`` fast for scripts that only need a few of its
+    functions."""
+
+    def __init__(self, alias, name):
+        self._alias = alias
+        self._name = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        globals()[self._alias] = module
+        return getattr(module, attr)
+
+
+# external
+np = _LazyModule('np', 'numpy')
+pd = _LazyModule('pd', 'pandas')
 
 
 def compute_num_teams(num_people, min_in_team, max_num_teams):
@@ -47,6 +68,225 @@ def compute_num_teams(num_people, min_in_team, max_num_teams):
     return num_teams, max_in_team, num_larger_teams
 
 
+CHOICE_COLUMNS = ['Project Choice #{}'.format(i) for i in range(1, 6)]
+
+
+def _find_column(frame, candidates):
+    """Returns the first of the candidate column names present in the frame or
+    None if none of them are."""
+    for col in candidates:
+        if col in frame.columns:
+            return col
+
+
+# the columns of the CATME export that teamo uses and how they are stored
+CATME_SCHEMA = dict([
+    ('Name', 'string'),
+    ('Student ID', 'string'),
+    ('Studio Section', 'category'),
+    ('Studio Switch', 'category'),
+    ('Sex', 'category'),
+    ('Race', 'category'),
+    ('GPA', 'category'),
+] + [(col, 'category') for col in CHOICE_COLUMNS])
+
+CATME_OPTIONAL_COLUMNS = ['Student ID']
+
+
+class _Categories(object):
+    """Accumulates the categories of categorical chunks into one list of
+    labels so that the codes of all of the chunks share it."""
+
+    def __init__(self, clean=None):
+        self.labels = []
+        self._lookup = {}
+        self._clean = clean
+
+    def encode(self, values):
+        """Returns the codes of a categorical Series against the accumulated
+        labels, -1 where missing."""
+        lookup = []
+        for label in values.cat.categories:
+            if self._clean is not None:
+                label = self._clean(label)
+            if label not in self._lookup:
+                self._lookup[label] = len(self.labels)
+                self.labels.append(label)
+            lookup.append(self._lookup[label])
+        # the appended -1 is picked by the missing values' code of -1
+        lookup = np.array(lookup + [-1], dtype=np.int32)
+        return lookup[values.cat.codes.to_numpy()]
+
+    def categorical(self, codes):
+        return pd.Categorical.from_codes(codes, categories=self.labels)
+
+
+def _clean_project_id(label):
+    return str(label).lower().strip()
+
+
+def read_catme(path, chunksize=100000):
+    """Returns the CATME export with only the columns teamo uses, stored
+    compactly. The file is read in chunks and the repeated text columns, i.e.
+    the section, gender, race, GPA and project choices, are parsed straight
+    into categoricals so that the whole file never exists as Python strings.
+    The GPA is read as floats if all of them are numbers and is otherwise
+    kept as the survey's text, e.g. "a) 4.0-3.5".
+
+    Parameters
+    ==========
+    path : string or file-like
+        The CSV export of the CATME survey.
+    chunksize : integer, optional
+        The number of rows parsed at a time.
+
+    Returns
+    =======
+    catme : pandas.DataFrame
+        The columns of CATME_SCHEMA with their dtypes. The project choice
+        columns share one set of categories and hold lower case project ids.
+        This can be passed wherever the raw export is accepted.
+
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    if hasattr(path, 'seek'):
+        path.seek(0)
+    missing = [col for col in CATME_SCHEMA if col not in header and
+               col not in CATME_OPTIONAL_COLUMNS]
+    if missing:
+        msg = 'The CATME export is missing the columns: {}'
+        raise ValueError(msg.format(', '.join(missing)))
+    columns = [col for col in CATME_SCHEMA if col in header]
+    categorical = [col for col in columns
+                   if CATME_SCHEMA[col] == 'category']
+
+    categories = {col: _Categories() for col in categorical
+                  if col not in CHOICE_COLUMNS}
+    project_ids = _Categories(clean=_clean_project_id)
+    for col in CHOICE_COLUMNS:
+        categories[col] = project_ids
+
+    codes = {col: [] for col in categorical}
+    others = []
+    reader = pd.read_csv(path, usecols=columns,
+                         dtype={col: CATME_SCHEMA[col] for col in columns},
+                         chunksize=chunksize)
+    for chunk in reader:
+        for col in categorical:
+            codes[col].append(categories[col].encode(chunk[col]))
+        others.append(chunk.drop(columns=categorical))
+
+    if others:
+        catme = pd.concat(others, ignore_index=True)
+    else:
+        catme = pd.DataFrame({col: pd.Series(dtype=CATME_SCHEMA[col])
+                              for col in columns if col not in categorical})
+    for col in categorical:
+        col_codes = (np.concatenate(codes[col]) if codes[col] else
+                     np.empty(0, dtype=np.int32))
+        catme[col] = categories[col].categorical(col_codes)
+
+    # as with read_csv, a GPA column of numbers holds floats, the text of
+    # the survey's answers is kept as categories
+    gpa = catme['GPA']
+    numbers = pd.to_numeric(pd.Series(gpa.cat.categories, dtype=object),
+                            errors='coerce').to_numpy(dtype=float)
+    if not np.isnan(numbers).any():
+        catme['GPA'] = np.append(numbers, np.nan)[gpa.cat.codes.to_numpy()]
+    return catme[columns]
+
+
+def _clean_ids(ids):
+    """Returns the student IDs as stripped strings, NaN where missing. A
+    column of integer IDs is read as floats if any ID is missing, these are
+    written without the ".0" so that they match the IDs read as integers."""
+    if pd.api.types.is_float_dtype(ids):
+        present = ids.dropna()
+        if (present == present.round()).all():
+            ids = ids.astype('Int64')
+    return ids.astype(str).str.strip().where(ids.notna())
+
+
+def _match_responses(roster, catme):
+    """Returns the row of the survey response of each roster entry, -1 for
+    students without a response. Rows are matched by student ID if both
+    tables have one, falling back to the student's name."""
+    positions = np.arange(len(catme))
+
+    # NOTE : duplicated keys in the survey keep the first response
+    by_name = pd.Series(positions, index=catme['Name'])
+    by_name = by_name[~by_name.index.duplicated()]
+    match = roster['Name'].map(by_name)
+
+    roster_id = _find_column(roster, ['ID', 'Student ID'])
+    catme_id = _find_column(catme, ['Student ID', 'ID'])
+    if roster_id is not None and catme_id is not None:
+        by_id = pd.Series(positions, index=_clean_ids(catme[catme_id]))
+        by_id = by_id[by_id.index.notna() & ~by_id.index.duplicated()]
+        id_match = _clean_ids(roster[roster_id]).map(by_id)
+        match = id_match.fillna(match)
+
+    return match.fillna(-1).astype(int).to_numpy()
+
+
+def join_roster_and_catme(roster, catme_data):
+    """Returns a DataFrame with one row per roster entry holding the parsed
+    CATME survey response of that student. The roster and the survey are
+    joined once, by student ID if both tables have one, falling back to the
+    student's name for any unmatched rows.
+
+    Parameters
+    ==========
+    roster : pandas.DataFrame
+        Columns: Name, ID, email, Section
+    catme_data : pandas.DataFrame
+        An export of the CATME survey with the standard column names.
+
+    Returns
+    =======
+    table : pandas.DataFrame
+        Indexed like the roster with the columns: name, section,
+        willing_to_switch, gender, selections, gpa, race, responded. The
+        survey columns are None for students that did not respond.
+
+    """
+    catme = catme_data.reset_index(drop=True)
+    match = _match_responses(roster, catme)
+    responded = match >= 0
+    joined = catme.reindex(match)
+    joined.index = roster.index
+
+    choices = joined[CHOICE_COLUMNS].astype(object)
+    for col in CHOICE_COLUMNS:
+        c = choices[col]
+        notnull = c.notnull()
+        cleaned = c[notnull].astype(str).str.lower().str.strip()
+        choices.loc[notnull, col] = cleaned
+    selections = [[s for s in row if not pd.isnull(s)] if r else None
+                  for row, r in zip(choices.to_numpy().tolist(), responded)]
+
+    section = roster['Section'].astype(object).where(responded, None)
+    wrong = responded & (roster['Section'] != joined['Studio Section'])
+    for name in roster['Name'][wrong]:
+        print('{} reported wrong section.'.format(name))
+
+    def survey_column(col):
+        return joined[col].astype(object).where(responded, None)
+
+    return pd.DataFrame({
+        'name': roster['Name'],
+        'section': section,
+        'willing_to_switch': (joined['Studio Switch'] == 'Yes').astype(
+            object).where(responded, None),
+        'gender': survey_column('Sex'),
+        'selections': selections,
+        'gpa': survey_column('GPA'),
+        'race': survey_column('Race'),
+        'responded': responded,
+    }, index=roster.index)
+
+
+@instrument.timed('load.students')
 def populate_students(roster, catme_data):
     """Returns a dictionary of intialized Person objects representing each
     student.
@@ -64,105 +304,464 @@ def populate_students(roster, catme_data):
         All of the students in the class keyed by the person's name.
 
     """
+    table = join_roster_and_catme(roster, catme_data)
     students = {}
-    for roster_idx, roster_row in roster.iterrows():
-        name = roster_row['Name']
-        section = roster_row['Section']
-        row = catme_data[catme_data['Name'] == name]
-        if len(row) == 0:
-            person = Person(name)
-        else:
-            r = row[['Project Choice #1',
-                     'Project Choice #2',
-                     'Project Choice #3',
-                     'Project Choice #4',
-                     'Project Choice #5']]
-            selections = r.values.squeeze().tolist()
-            if all(pd.isnull(selections)):
-                selections = []
-            else:
-                selections = [s.lower().strip() for s in selections]
-            self_reported_sec = row['Studio Section'].iloc[0]
-            if section != self_reported_sec:
-                print('{} reported wrong section.'.format(name))
-            person = Person(name,
-                            section,
-                            True if row['Studio Switch'].iloc[0] == 'Yes' else False,
-                            row['Sex'].iloc[0],
-                            selections,
-                            row['GPA'].iloc[0],
-                            row['Race'].iloc[0])
+    for row in zip(table['name'], table['section'],
+                   table['willing_to_switch'], table['gender'],
+                   table['selections'], table['gpa'], table['race']):
+        person = Person(*row)
         students[person.name] = person
     return students
 
 
-def populate_projects(project_dir):
+def _parse_skills(s):
+    return [skill.strip() for skill in str(s).split(',')]
+
+
+PROJECT_FIELDS = {
+    'title': str,
+    'org': str,
+    'org_url': str,
+    'skills': _parse_skills,
+    'location': str,
+    'id': str,
+    'status': str,
+    'template': str,
+}
+
+
+PROJECT_CACHE_VERSION = 1
+
+
+def _parse_project_source(text):
+    """Returns the metadata dictionary of the contents of a project rst
+    file."""
+    # docutils is slow to import so only do it when needed
+    from parse_rst import parse_metadata
+    return parse_metadata(text, PROJECT_FIELDS).metadata
+
+
+def _read_project_file(path):
+    """Returns the metadata dictionary of a single project rst file."""
+    with open(path, 'r') as f:
+        return _parse_project_source(f.read())
+
+
+def project_cache_path(project_dir):
+    """Returns the default location of the metadata cache for a project
+    directory, i.e. a file in the user's cache directory named after a hash
+    of the directory's absolute path."""
+    cache_home = os.environ.get('XDG_CACHE_HOME',
+                                os.path.join(os.path.expanduser('~'),
+                                             '.cache'))
+    key = hashlib.sha1(os.path.abspath(project_dir).encode('utf-8'))
+    return os.path.join(cache_home, 'teamo',
+                        'projects-{}.json'.format(key.hexdigest()))
+
+
+def _load_project_cache(cache_path):
+    """Returns the cached entries keyed by file path or an empty dictionary if
+    the cache is missing, unreadable or from an incompatible version."""
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (not isinstance(cache, dict) or
+            cache.get('version') != PROJECT_CACHE_VERSION or
+            cache.get('fields') != sorted(PROJECT_FIELDS)):
+        return {}
+    return cache.get('entries', {})
+
+
+def _save_project_cache(cache_path, entries):
+    cache = {'version': PROJECT_CACHE_VERSION,
+             'fields': sorted(PROJECT_FIELDS),
+             'entries': entries}
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    os.makedirs(directory, exist_ok=True)
+    # write to a temporary file first so an interrupted run can't leave a
+    # truncated cache behind
+    tmp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def _parse_project_files(paths, workers):
+    """Returns a list of the metadata dictionaries of the provided files."""
+    if workers is not None and workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(paths) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(_read_project_file, paths,
+                                     chunksize=chunksize))
+    else:
+        return [_read_project_file(path) for path in paths]
+
+
+def _parse_project_files_cached(paths, workers, cache_path):
+    """Returns a list of the metadata dictionaries of the provided files,
+    only parsing the files that are not in the cache. A cache entry is reused
+    if the file's modification time and size are unchanged or, failing that,
+    if the hash of its contents is unchanged."""
+    old_entries = _load_project_cache(cache_path)
+    entries = {}
+    stale = []
+    for path in paths:
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = old_entries.get(key)
+        if (entry is not None and entry['mtime'] == stat.st_mtime_ns and
+                entry['size'] == stat.st_size):
+            entries[key] = entry
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if entry is not None and entry['sha1'] == digest:
+            metadata = entry['metadata']
+        else:
+            metadata = None
+            stale.append((key, content.decode('utf-8')))
+        entries[key] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+                        'sha1': digest, 'metadata': metadata}
+
+    instrument.count('load.projects.cache_hits', len(paths) - len(stale))
+    instrument.count('load.projects.cache_misses', len(stale))
+    if stale:
+        texts = [text for key, text in stale]
+        if workers is not None and workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            chunksize = max(1, len(texts) // (4 * workers))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                parsed = list(executor.map(_parse_project_source, texts,
+                                           chunksize=chunksize))
+        else:
+            parsed = [_parse_project_source(text) for text in texts]
+        for (key, text), metadata in zip(stale, parsed):
+            entries[key]['metadata'] = metadata
+
+    if entries != old_entries:
+        _save_project_cache(cache_path, entries)
+
+    return [entries[os.path.abspath(path)]['metadata'] for path in paths]
+
+
+@instrument.timed('load.projects')
+def populate_projects(project_dir, workers=None, cache_path=None):
     """Returns a dictionary containing all of the projects in the provided
     directory. This directory should contain the Pelican rst files, one for
-    each project."""
-
-    field_names_and_parsers = {
-        'title': str,
-        'org': str,
-        'org_url': str,
-        'skills': lambda s: [skill.strip() for skill in str(s).split(',')],
-        'location': str,
-        'id': str,
-        'status': str,
-        'template': str,
-    }
+    each project.
+
+    Parameters
+    ==========
+    project_dir : string
+        Path to the directory of project rst files.
+    workers : integer, optional
+        If greater than one, the files are parsed across a pool of this many
+        processes.
+    cache_path : string, optional
+        Path to a JSON file that stores the parsed metadata of each file, see
+        ``project_cache_path()`` for a sensible default. Only files that are
+        new or have changed since the cache was written are parsed.
+
+    Returns
+    =======
+    projects : dictionary of Project
+        All of the projects keyed by id, in the order of the ids.
+
+    """
+    paths = [os.path.join(project_dir, f)
+             for f in sorted(os.listdir(project_dir))]
+
+    if cache_path is None:
+        all_metadata = _parse_project_files(paths, workers)
+    else:
+        all_metadata = _parse_project_files_cached(paths, workers, cache_path)
+
     projects = {}
-    for rst_file in os.listdir(project_dir):
-        with open(os.path.join(project_dir, rst_file), 'r') as f:
-            data = parse_document(f.read(), field_names_and_parsers)
-            project = Project(data.metadata['id'], data.metadata['title'])
-            projects[project.id] = project
+    sources = {}
+    for path, metadata in zip(paths, all_metadata):
+        project = Project(metadata['id'], metadata['title'])
+        if project.id in projects:
+            msg = "Project id '{}' is used by both {} and {}."
+            raise ValueError(msg.format(project.id, sources[project.id],
+                                        path))
+        projects[project.id] = project
+        sources[project.id] = path
+
+    # the file names need not match the ids
+    return {proj_id: projects[proj_id] for proj_id in sorted(projects)}
+
+
+def encode_choices(all_selections, project_ids=None, extend=False):
+    """Returns the ranked project choices as a matrix of project indices.
+
+    Parameters
+    ==========
+    all_selections : sequence of sequence of string
+        The ordered project ids selected by each student, None or empty if
+        none.
+    project_ids : iterable of string, optional
+        The projects to encode against.
+    extend : boolean, optional
+        If True, selected projects that are not in project_ids are appended
+        to it in order of first appearance, otherwise they are coded -1. This
+        is always done if project_ids is not given.
 
-    return projects
+    Returns
+    =======
+    choices : ndarray, shape(n, m)
+        The index in project_ids of each student's choices, in rank order,
+        padded with -1 to the largest number of choices m.
+    project_ids : list of string
+
+    """
+    extend = extend or project_ids is None
+    project_ids = [] if project_ids is None else list(project_ids)
+    lookup = {proj_id: i for i, proj_id in enumerate(project_ids)}
+    all_selections = [s or [] for s in all_selections]
+    num_choices = max([len(s) for s in all_selections] + [0])
+    choices = np.full((len(all_selections), num_choices), -1, dtype=int)
+    for i, selections in enumerate(all_selections):
+        for j, proj_id in enumerate(selections):
+            code = lookup.get(proj_id)
+            if code is None and extend:
+                code = lookup[proj_id] = len(project_ids)
+                project_ids.append(proj_id)
+            choices[i, j] = -1 if code is None else code
+    return choices, project_ids
+
+
+def tally_votes(choices, num_projects, weights=None):
+    """Returns the number of votes of each project.
+
+    Parameters
+    ==========
+    choices : array_like of integer, shape(n, m)
+        The project index of each student's choices in rank order, -1 where
+        there is no choice, see ``encode_choices()``.
+    num_projects : integer
+    weights : array_like of float, optional
+        The points a choice of each rank is worth, ranks past the end of the
+        weights are worth nothing. By default every choice is one vote.
 
+    Returns
+    =======
+    votes : ndarray, shape(num_projects,)
 
+    """
+    choices = np.asarray(choices, dtype=int)
+    if choices.ndim == 1:
+        choices = choices[:, np.newaxis]
+    present = choices >= 0
+    if weights is None:
+        return np.bincount(choices[present], minlength=num_projects)
+    weights = np.asarray(weights, dtype=float)[:choices.shape[1]]
+    per_rank = np.zeros(choices.shape[1])
+    per_rank[:len(weights)] = weights
+    per_choice = np.broadcast_to(per_rank, choices.shape)[present]
+    return np.bincount(choices[present], weights=per_choice,
+                       minlength=num_projects)
+
+
+def _project_votes(students, projects, weights=None):
+    """Returns a DataFrame of the votes and title of every project, including
+    those without votes and any selected projects that are not in
+    projects."""
+    if isinstance(students, EncodedStudents):
+        project_ids = list(projects)
+        lookup = {proj_id: i for i, proj_id in enumerate(project_ids)}
+        for proj_id in students.project_ids:
+            if proj_id not in lookup:
+                lookup[proj_id] = len(project_ids)
+                project_ids.append(proj_id)
+        # the extra entry maps the -1 of no choice to itself
+        mapping = np.array([lookup[p] for p in students.project_ids] + [-1],
+                           dtype=int)
+        choices = mapping[students.choices]
+    else:
+        choices, project_ids = encode_choices(
+            [p.selections for p in students.values()], projects, extend=True)
+    votes = tally_votes(choices, len(project_ids), weights)
+    if weights is not None and np.all(np.mod(weights, 1) == 0):
+        votes = votes.astype(int)
+    titles = [projects[p].title if p in projects else np.nan
+              for p in project_ids]
+    return pd.DataFrame({'votes': votes, 'title': titles},
+                        index=project_ids)
+
+
+@instrument.timed('rank.votes')
 def rank_projects(students, projects):
     """Returns a DataFrame with the number of votes that each project
-    received."""
-
-    all_votes = []
-    for name, person in students.items():
-        if person.selections is not None:
-            all_votes += person.selections
-    c = Counter(all_votes)
-    votes = pd.DataFrame(c.most_common(), columns=['id', 'votes'])
-    votes.index = votes['id']
-    del votes['id']
-    zero_votes = set(projects.keys()).difference(set(votes.index))
-    z = pd.DataFrame([0] * len(zero_votes),
-                     columns=['votes'],
-                     index=list(zero_votes))
-    votes = votes.append(z)
-    titles = pd.Series([p.title for p in projects.values()],
-                       index=projects.keys())
-    votes['title'] = titles
-
-    return votes
-
-
-def rank_projects_weighted(students, projects):
+    received, most votes first.
+
+    Parameters
+    ==========
+    students : dictionary of Person or EncodedStudents
+        The students, encoded students make repeated rankings faster.
+    projects : dictionary of Project
+        The projects keyed by id, projects without votes are included.
+
+    """
+    votes = _project_votes(students, projects)
+    return votes.sort_values('votes', ascending=False, kind='stable')
+
+
+@instrument.timed('rank.weighted')
+def rank_projects_weighted(students, projects, weights=None):
     """Returns a DataFrame with the number of weighted votes that each project
-    received. If projects were selected as a first choice it gets 5 points and
-    if 5th choice it gets 1 point."""
-    scores = defaultdict(lambda: 0)
-    for name, person in students.items():
-        if person.selections:
-            scores[person.selections[0]] += 5
-            scores[person.selections[1]] += 4
-            scores[person.selections[2]] += 3
-            scores[person.selections[3]] += 2
-            scores[person.selections[4]] += 1
-    votes_df = pd.DataFrame({'votes': list(scores.values())},
-                            index=scores.keys())
-    titles_df = pd.DataFrame({'title': [p.title for p in projects.values()]},
-                             index=projects.keys())
-    votes_df['title'] = titles_df
-    return votes_df.sort_values('votes', ascending=False)
+    received, most votes first. By default, with 5 choices, a first choice
+    gets 5 points and a 5th choice gets 1 point.
+
+    Parameters
+    ==========
+    students : dictionary of Person or EncodedStudents
+        The students, encoded students make repeated rankings faster.
+    projects : dictionary of Project
+        The projects keyed by id, projects without votes are included.
+    weights : array_like of float, optional
+        The points of a choice of each rank, first choice first. Defaults to
+        5, 4, 3, 2, 1, for the CATME survey's five choices. Choices past the
+        last weight get no points.
+
+    """
+    if weights is None:
+        weights = range(len(CHOICE_COLUMNS), 0, -1)
+    votes = _project_votes(students, projects, weights)
+    return votes.sort_values('votes', ascending=False, kind='stable')
+
+
+class RankingAccumulator(object):
+    """Keeps the raw and weighted project votes current as survey responses
+    arrive, e.g. to watch the popularity of the proposals while the survey
+    is open. Adding, replacing or removing a response costs in proportion to
+    its number of choices.
+
+    The tallies match ``rank_projects()`` and ``rank_projects_weighted()``
+    given the same weights."""
+
+    def __init__(self, projects=None, weights=None):
+        """
+        Parameters
+        ==========
+        projects : dictionary of Project, optional
+            The projects keyed by id, these are listed even without votes.
+        weights : array_like of float, optional
+            The points of a choice of each rank, first choice first. Defaults
+            to 5, 4, 3, 2, 1, for the CATME survey's five choices.
+
+        """
+        self.projects = {} if projects is None else projects
+        if weights is None:
+            weights = range(len(CHOICE_COLUMNS), 0, -1)
+        self.weights = list(weights)
+        self._responses = {}
+        self._votes = {}
+        self._points = {}
+
+    def __len__(self):
+        return len(self._responses)
+
+    def __contains__(self, key):
+        return key in self._responses
+
+    def _tally(self, selections, sign):
+        for rank, proj_id in enumerate(selections):
+            self._votes[proj_id] = self._votes.get(proj_id, 0) + sign
+            if rank < len(self.weights):
+                self._points[proj_id] = (self._points.get(proj_id, 0) +
+                                         sign * self.weights[rank])
+            if self._votes[proj_id] == 0:
+                del self._votes[proj_id]
+                self._points.pop(proj_id, None)
+
+    def add(self, key, selections):
+        """Adds a student's response, replacing their earlier response if
+        there is one.
+
+        Parameters
+        ==========
+        key : hashable
+            Identifies the student, e.g. their student ID or name.
+        selections : sequence of string
+            The selected project ids, first choice first. None or empty
+            removes the student's response.
+
+        """
+        selections = tuple(selections or ())
+        old = self._responses.get(key)
+        if old == selections:
+            return
+        if old is not None:
+            self._tally(old, -1)
+            del self._responses[key]
+        if selections:
+            self._tally(selections, 1)
+            self._responses[key] = selections
+
+    def update(self, responses):
+        """Adds a batch of responses, see ``add()``.
+
+        Parameters
+        ==========
+        responses : dictionary or iterable of (key, selections)
+
+        """
+        if hasattr(responses, 'items'):
+            responses = responses.items()
+        for key, selections in responses:
+            self.add(key, selections)
+
+    def update_from_catme(self, catme_data):
+        """Adds the responses in rows of the CATME export, e.g. the rows that
+        are new since the last update, keyed by student ID if the student
+        has one or else the name."""
+        id_col = _find_column(catme_data, ['Student ID', 'ID'])
+        if 'Name' in catme_data.columns:
+            keys = catme_data['Name'].astype(str).str.strip()
+        elif id_col is None:
+            raise ValueError('The CATME export has no Name or ID column.')
+        else:
+            keys = pd.Series(np.nan, index=catme_data.index, dtype=object)
+        if id_col is not None:
+            # students without an ID fall back to their name
+            ids = _clean_ids(catme_data[id_col])
+            keys = ids.astype(object).where(ids.notna(), keys)
+        if keys.isna().any():
+            raise ValueError('Some responses have neither a name nor an ID.')
+        choices = catme_data[CHOICE_COLUMNS].astype(object)
+        rows = zip(keys, choices.to_numpy().tolist())
+        self.update((key, [_clean_project_id(c) for c in row
+                           if not pd.isnull(c)]) for key, row in rows)
+
+    def remove(self, key):
+        """Removes the student's response."""
+        if key not in self._responses:
+            raise ValueError('There is no response for {}.'.format(key))
+        self.add(key, None)
+
+    def _frame(self, tally):
+        project_ids = list(self.projects)
+        # any other project someone selected, even without points
+        project_ids += [p for p in self._votes if p not in self.projects]
+        titles = [self.projects[p].title if p in self.projects else np.nan
+                  for p in project_ids]
+        votes = pd.DataFrame({'votes': [tally.get(p, 0) for p in
+                                        project_ids],
+                              'title': titles}, index=project_ids)
+        return votes.sort_values('votes', ascending=False, kind='stable')
+
+    def votes(self):
+        """Returns the current raw votes, see ``rank_projects()``."""
+        return self._frame(self._votes)
+
+    def rankings(self):
+        """Returns the current weighted votes, see
+        ``rank_projects_weighted()``."""
+        return self._frame(self._points)
 
 
 class ChooseAnyOrAllQuestion(object):
@@ -173,10 +772,23 @@ class ScheduleCompatibilityQuestion(object):
 
 class ProjectRankQuestion(object):
 
-    def __init__(self, projects):
+    def __init__(self, projects, responses=None):
+        """
+        Parameters
+        ==========
+        projects : iterable
+            The ids of all of the projects.
+        responses : iterable of iterable, optional
+            The ranked project choices of every student in the class. If
+            given, they are indexed with ``index_responses()``.
+
+        """
 
         self.projects = projects
 
+        if responses is not None:
+            self.index_responses(responses)
+
     def compute_score(self, project, responses, ordered=False):
         """Returns a score from 0 to 1."""
         score = 0
@@ -194,6 +806,120 @@ class ProjectRankQuestion(object):
                     score += 1
         return score / len(responses)
 
+    def index_responses(self, responses):
+        """Builds a sparse student x project matrix of the position (1 for
+        the first choice) each student ranked each project at, stored by
+        project so that the students that chose a project are a contiguous
+        slice. The ``compute_scores()`` and ``compute_team_score()`` methods
+        then score teams from this matrix instead of the response lists.
+
+        Parameters
+        ==========
+        responses : iterable of iterable
+            The ranked project choices of each student, the student's index
+            is its position in this iterable.
+
+        """
+        lookup = {proj_id: j for j, proj_id in enumerate(self.projects)}
+        self._project_index = lookup
+
+        lengths = []
+        students, columns, positions = [], [], []
+        for i, response in enumerate(responses):
+            response = list(response) if response else []
+            lengths.append(len(response))
+            chosen = {}
+            for k, proj_id in enumerate(response):
+                j = lookup.get(proj_id)
+                # a project chosen twice ranks by its last position, as in
+                # compute_score()
+                if j is not None:
+                    chosen[j] = k + 1
+            for j, position in chosen.items():
+                students.append(i)
+                columns.append(j)
+                positions.append(position)
+
+        self.response_lengths = np.array(lengths, dtype=int)
+        columns = np.array(columns, dtype=int)
+        order = np.argsort(columns, kind='stable')
+        self._rank_columns = columns[order]
+        self._rank_students = np.array(students, dtype=int)[order]
+        self._rank_positions = np.array(positions, dtype=int)[order]
+        self._rank_indptr = np.searchsorted(self._rank_columns,
+                                            np.arange(len(lookup) + 1))
+
+    def compute_scores(self, teams, num_teams=None, ordered=False):
+        """Returns the score of every team for every project from the indexed
+        responses.
+
+        Parameters
+        ==========
+        teams : array_like of integer, shape(n,)
+            The team index of each indexed student, -1 if unassigned.
+        num_teams : integer, optional
+            The number of teams, defaults to one more than the largest index.
+        ordered : boolean, optional
+            If True, higher ranked choices score higher.
+
+        Returns
+        =======
+        scores : ndarray, shape(num_teams, num_projects)
+            The score from 0 to 1 of each (team, project) pair, with the
+            projects in the order of ``projects``.
+
+        """
+        teams = np.asarray(teams, dtype=int)
+        if num_teams is None:
+            num_teams = int(teams.max()) + 1
+        num_projects = len(self._project_index)
+        assigned = teams >= 0
+        sizes = np.bincount(teams[assigned], minlength=num_teams)
+
+        entry_teams = teams[self._rank_students]
+        keep = entry_teams >= 0
+        bins = entry_teams[keep] * num_projects + self._rank_columns[keep]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if not ordered:
+                counts = np.bincount(bins, minlength=num_teams * num_projects)
+                counts = counts.reshape(num_teams, num_projects)
+                return counts / sizes[:, np.newaxis]
+            max_rank = np.zeros(num_teams, dtype=int)
+            np.maximum.at(max_rank, teams[assigned],
+                          self.response_lengths[assigned])
+            ranks = (max_rank[entry_teams[keep]] + 1 -
+                     self._rank_positions[keep])
+            totals = np.bincount(bins, weights=ranks,
+                                 minlength=num_teams * num_projects)
+            totals = totals.reshape(num_teams, num_projects)
+            return totals / sizes[:, np.newaxis] / max_rank[:, np.newaxis]
+
+    def compute_team_score(self, project, members, ordered=False):
+        """Returns the score from 0 to 1 of a single team for a project from
+        the indexed responses. This only looks at the students that chose
+        the project.
+
+        Parameters
+        ==========
+        project : string
+            The project id.
+        members : array_like of integer
+            The indices of the team's members.
+        ordered : boolean, optional
+            If True, higher ranked choices score higher.
+
+        """
+        members = np.asarray(members, dtype=int)
+        j = self._project_index[project]
+        start, stop = self._rank_indptr[j], self._rank_indptr[j + 1]
+        on_team = np.isin(self._rank_students[start:stop], members)
+        if not ordered:
+            return on_team.sum() / len(members)
+        max_rank = self.response_lengths[members].max()
+        ranks = max_rank + 1 - self._rank_positions[start:stop][on_team]
+        return ranks.sum() / len(members) / max_rank
+
 
 class UnderrepresentedMemberQuestion(object):
 
@@ -255,26 +981,52 @@ class MultipleChoiceSingleAnswerQuestion(object):
 
         """
 
-        score = 0
+        # a single team is faster in pure Python than through
+        # compute_scores(), which must give the same scores, see the tests
+        responses = list(responses)
+        num_distinct = len(set(responses).intersection(self.choices))
+        return num_distinct / len(responses)
 
-        for selection in self.choices:
-            for response in responses:
-                if response == selection:
-                    or_result = 1
-                    break
-                else:
-                    or_result = 0
-            score += or_result
-            or_result = 0
+    def encode(self, responses):
+        """Returns an integer array with the index in ``choices`` of each
+        response, -1 for responses that are not one of the choices."""
+        lookup = {}
+        for i, selection in enumerate(self.choices):
+            lookup.setdefault(selection, i)
+        return np.array([lookup.get(r, -1) for r in responses], dtype=int)
+
+    def compute_scores(self, responses, teams, num_teams=None):
+        """Returns the score of every team at once.
 
-        score = score / len(responses)
+        Parameters
+        ==========
+        responses : array_like of integer, shape(n,)
+            The encoded response of each of the n students, see ``encode()``.
+        teams : array_like of integer, shape(n,) or shape(m, n)
+            The team index of each student, -1 if unassigned. A two
+            dimensional array holds m candidate assignments.
+        num_teams : integer, optional
+            The number of teams, defaults to one more than the largest index.
+
+        Returns
+        =======
+        scores : ndarray, shape(num_teams,) or shape(m, num_teams)
+            The score from 0.0 to 1.0 of each team.
 
-        return score
+        """
+        teams = np.asarray(teams)
+        if num_teams is None:
+            num_teams = int(teams.max()) + 1
+        return distinct_label_scores(teams, responses, num_teams,
+                                     len(self.choices))
 
 
 class Person(object):
     """Represents a single person in the pool of potential team members."""
 
+    __slots__ = ('name', 'original_section', 'willing_to_switch', 'gender',
+                 'selections', 'gpa', 'race')
+
     def __init__(self, name, original_section=None, willing_to_switch=None,
                  gender=None, selections=None, gpa=None, race=None):
         """
@@ -356,11 +1108,52 @@ class Project(object):
         return "Project('{}', '{}')".format(self.id, self.title)
 
 
+UNDERREPRESENTED_GENDERS = ('Female', 'Other/Prefer not to answer')
+
+
+def _is_missing(value):
+    # NaN is the only value not equal to itself
+    return value is None or value != value
+
+
+def _numeric_gpa(gpa):
+    """Returns the GPA as a float or None if it is missing or not a number,
+    e.g. a survey answer like "a) 4.0-3.5"."""
+    if _is_missing(gpa):
+        return None
+    try:
+        gpa = float(gpa)
+    except (TypeError, ValueError):
+        return None
+    return None if _is_missing(gpa) else gpa
+
+
 class Team(object):
+    """Represents a team of people. Running tallies of the members'
+    attributes are updated as members are added and removed so that all of
+    the queries are constant time."""
 
-    def __init__(self, members=None):
-        self._section = None
+    def __init__(self, members=None, section=None):
+        """
+        Parameters
+        ==========
+        members : iterable of Person, optional
+            The initial members.
+        section : string, optional
+            The section the team meets in. If not given, the section is set
+            by the first member added.
+
+        """
+        self._fixed_section = section
+        self._section = section
         self.members = []
+        self._gender_counts = Counter()
+        self._race_counts = Counter()
+        self._identity_counts = Counter()
+        self._section_counts = Counter()
+        self._preference_counts = Counter()
+        self._gpa_sum = 0.0
+        self._num_gpas = 0
         if members is not None:
             for m in members:
                 self.add_member(m)
@@ -369,8 +1162,35 @@ class Team(object):
         return len(self.members)
 
     def num_females(self):
-        return len([m for m in self.members if m.gender in
-                    ['Female', 'Other/Prefer not to answer']])
+        return sum(self._gender_counts[g] for g in UNDERREPRESENTED_GENDERS)
+
+    def num_with_gender(self, gender):
+        return self._gender_counts[gender]
+
+    def num_with_race(self, race):
+        return self._race_counts[race]
+
+    def num_underrepresented(self, underrep_groups):
+        """Returns the number of members whose gender or race is in the
+        provided groups."""
+        underrep_groups = set(underrep_groups)
+        return sum(n for (gender, race), n in self._identity_counts.items()
+                   if gender in underrep_groups or race in underrep_groups)
+
+    def num_from_section(self, section):
+        """Returns the number of members originally registered in the
+        section."""
+        return self._section_counts[section]
+
+    def num_chose(self, proj_id):
+        """Returns the number of members that selected the project."""
+        return self._preference_counts[proj_id]
+
+    def mean_gpa(self):
+        """Returns the mean GPA of the members that reported one or None."""
+        if self._num_gpas == 0:
+            return None
+        return self._gpa_sum / self._num_gpas
 
     def has_female(self):
         if self.num_females() >= 1:
@@ -384,22 +1204,764 @@ class Team(object):
         else:
             return False
 
+    def _tally(self, person, sign):
+        self._gender_counts[person.gender] += sign
+        self._race_counts[person.race] += sign
+        identity = (person.gender, person.race)
+        self._identity_counts[identity] += sign
+        if self._identity_counts[identity] == 0:
+            del self._identity_counts[identity]
+        self._section_counts[person.original_section] += sign
+        if person.selections:
+            for proj_id in person.selections:
+                self._preference_counts[proj_id] += sign
+        gpa = _numeric_gpa(person.gpa)
+        if gpa is not None:
+            self._gpa_sum += sign * gpa
+            self._num_gpas += sign
+
     def add_member(self, person):
-        if len(self.members) == 0:
+        if len(self.members) == 0 and self._fixed_section is None:
             if person.willing_to_switch:
                 self._section = choice(['A02', 'A03'])
             else:
                 self._section = person.original_section
-            self.members.append(person)
-        else:
-            if person.willing_to_switch:
-                self.members.append(person)
-            else:
-                if person.original_section != self.section():
-                    msg = "Can't add {} to this group, not a matching section."
-                    raise ValueError(msg.format(person.name))
-                else:
-                    self.members.append(person)
+        elif (not person.willing_to_switch and
+              person.original_section != self.section()):
+            msg = "Can't add {} to this group, not a matching section."
+            raise ValueError(msg.format(person.name))
+        self.members.append(person)
+        self._tally(person, 1)
+
+    def remove_member(self, person):
+        """Removes the person from the team. The team's section is kept
+        unless the team is left empty and the section was set by its
+        members."""
+        try:
+            self.members.remove(person)
+        except ValueError:
+            msg = "{} is not a member of this team."
+            raise ValueError(msg.format(person.name))
+        self._tally(person, -1)
+        if len(self.members) == 0:
+            self._section = self._fixed_section
+            self._gpa_sum = 0.0
 
     def section(self):
         return self._section
+
+
+class StudentPool(object):
+    """The people that are still available to be placed on teams. This is an
+    ordered set keyed by name: membership tests, adding and removing take
+    constant time and iteration is in the order people were added.
+
+    Indexes with ``add()`` and ``remove()`` methods, e.g. SectionIndex and
+    ChoiceIndex, can be attached to the pool to be kept in sync with it."""
+
+    def __init__(self, people=()):
+        """
+        Parameters
+        ==========
+        people : iterable of Person, optional
+            The available people, in order.
+
+        """
+        self._people = {}
+        self._indexes = []
+        for person in people:
+            self.add(person)
+
+    def __len__(self):
+        return len(self._people)
+
+    def __iter__(self):
+        return iter(self._people.values())
+
+    def __contains__(self, person):
+        return self._people.get(person.name) is person
+
+    def __getitem__(self, name):
+        return self._people[name]
+
+    def add_index(self, index):
+        """Adds everyone in the pool to the index, keeps the index in sync
+        with the pool from then on and returns it."""
+        for person in self:
+            index.add(person)
+        self._indexes.append(index)
+        return index
+
+    def add(self, person):
+        """Adds the person to the end of the pool. Raises a ValueError if
+        someone with the same name is already in it."""
+        if person.name in self._people:
+            msg = "{} is already in the pool."
+            raise ValueError(msg.format(person.name))
+        self._people[person.name] = person
+        for index in self._indexes:
+            index.add(person)
+
+    def remove(self, person):
+        """Removes the person. Raises a ValueError if they are not in the
+        pool."""
+        if person not in self:
+            msg = "{} is not in the pool."
+            raise ValueError(msg.format(person.name))
+        del self._people[person.name]
+        for index in self._indexes:
+            index.remove(person)
+
+    def discard(self, person):
+        """Removes the person if they are in the pool."""
+        if person in self:
+            self.remove(person)
+
+
+class SectionIndex(object):
+    """Keeps the set of available people that can attend each section so
+    that finding who is eligible for a section is a lookup instead of a scan
+    over everyone calling ``Person.can_attend()``. People are removed from
+    the index as they are placed on teams."""
+
+    def __init__(self, people=(), sections=()):
+        """
+        Parameters
+        ==========
+        people : iterable of Person, optional
+            The available people.
+        sections : iterable of string, optional
+            The sections to index, the sections the people are registered in
+            are added as they are seen.
+
+        """
+        self._available = set()
+        self._willing = set()
+        self._eligible = {}
+        for section in sections:
+            self._add_section(section)
+        for person in people:
+            self.add(person)
+
+    def _add_section(self, section):
+        # everyone willing to switch can attend a new section
+        self._eligible[section] = set(self._willing)
+
+    def _sections_of(self, person):
+        """Returns the indexed sections the person can attend."""
+        if person.willing_to_switch:
+            return list(self._eligible)
+        if person.original_section in self._eligible:
+            return [person.original_section]
+        return []
+
+    def __len__(self):
+        return len(self._available)
+
+    def __contains__(self, person):
+        return person in self._available
+
+    def sections(self):
+        return list(self._eligible)
+
+    def add(self, person):
+        """Makes the person available."""
+        section = person.original_section
+        if section is not None and section not in self._eligible:
+            self._add_section(section)
+        self._available.add(person)
+        if person.willing_to_switch:
+            self._willing.add(person)
+        for section in self._sections_of(person):
+            self._eligible[section].add(person)
+
+    def remove(self, person):
+        """Removes the person, e.g. once placed on a team. Raises a
+        ValueError if the person is not available."""
+        if person not in self._available:
+            msg = "{} is not available."
+            raise ValueError(msg.format(person.name))
+        self._available.remove(person)
+        self._willing.discard(person)
+        for section in self._sections_of(person):
+            self._eligible[section].discard(person)
+
+    def eligible(self, section):
+        """Returns the set of available people that can attend the section,
+        everyone if the section is None. The set must not be modified."""
+        if section is None:
+            return self._available
+        if section not in self._eligible:
+            return self._willing
+        return self._eligible[section]
+
+    def can_attend(self, person, section):
+        """Returns True if the person is available and can attend the
+        section."""
+        return person in self.eligible(section)
+
+    def filter(self, people, section):
+        """Returns the people, in order, that are available and can attend
+        the section."""
+        eligible = self.eligible(section)
+        return [person for person in people if person in eligible]
+
+
+class ChoiceIndex(object):
+    """An inverted index from each project id to the available people that
+    selected it, bucketed by the rank of their choice (0 for the first
+    choice). Fetching a project's choosers costs in proportion to their
+    number rather than the size of the class, and people are removed from
+    the index as they are placed on teams."""
+
+    def __init__(self, people=()):
+        """
+        Parameters
+        ==========
+        people : iterable of Person, optional
+            The available people, indexed by their selections at the time
+            they are added.
+
+        """
+        # project id -> list over the ranks of ordered dicts of people, the
+        # dicts keep the order people were added and remove in constant time
+        self._buckets = {}
+        # person -> the (project id, rank) entries of the person
+        self._entries = {}
+        for person in people:
+            self.add(person)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, person):
+        return person in self._entries
+
+    def add(self, person):
+        """Makes the person available under each of their selections."""
+        if person in self._entries:
+            msg = "{} is already in the index."
+            raise ValueError(msg.format(person.name))
+        entries = []
+        seen = set()
+        for rank, proj_id in enumerate(person.selections or []):
+            if proj_id in seen:  # keeps the best rank, like list.index()
+                continue
+            seen.add(proj_id)
+            buckets = self._buckets.setdefault(proj_id, [])
+            while len(buckets) <= rank:
+                buckets.append({})
+            buckets[rank][person] = None
+            entries.append((proj_id, rank))
+        self._entries[person] = entries
+
+    def remove(self, person):
+        """Removes the person, e.g. once placed on a team. Raises a
+        ValueError if the person is not in the index."""
+        try:
+            entries = self._entries.pop(person)
+        except KeyError:
+            msg = "{} is not in the index."
+            raise ValueError(msg.format(person.name))
+        for proj_id, rank in entries:
+            del self._buckets[proj_id][rank][person]
+
+    def num_choosers(self, proj_id):
+        """Returns the number of available people that selected the
+        project."""
+        return sum(len(b) for b in self._buckets.get(proj_id, []))
+
+    def ranked_choosers(self, proj_id, shuffle=None):
+        """Returns a list of (person, rank) of the available people that
+        selected the project, ordered by rank.
+
+        Parameters
+        ==========
+        proj_id : string
+        shuffle : function, optional
+            If given, e.g. ``random.shuffle``, it is called on the list of
+            people of each rank to randomize the order of equally ranked
+            people. Otherwise they are in the order they were added.
+
+        """
+        choosers = []
+        for rank, bucket in enumerate(self._buckets.get(proj_id, [])):
+            people = list(bucket)
+            if shuffle is not None:
+                shuffle(people)
+            choosers.extend((person, rank) for person in people)
+        return choosers
+
+    def choosers(self, proj_id, shuffle=None):
+        """Returns the list of the available people that selected the
+        project, ordered by rank, see ``ranked_choosers()``."""
+        return [person for person, rank in
+                self.ranked_choosers(proj_id, shuffle)]
+
+
+def _encode(values):
+    """Returns integer codes for the values and the list of distinct labels in
+    order of first appearance. Missing values are coded as -1."""
+    labels = []
+    lookup = {}
+    codes = np.empty(len(values), dtype=int)
+    for i, value in enumerate(values):
+        if _is_missing(value):
+            codes[i] = -1
+        else:
+            if value not in lookup:
+                lookup[value] = len(labels)
+                labels.append(value)
+            codes[i] = lookup[value]
+    return codes, labels
+
+
+def _relabel_by_appearance(codes, labels):
+    """Returns the codes renumbered and the labels reordered as ``_encode()``
+    would give them, i.e. in order of first appearance with unused labels
+    dropped."""
+    flat = codes.ravel()
+    used, first = np.unique(flat[flat >= 0], return_index=True)
+    used = used[np.argsort(first)]
+    # the extra -1 entry is picked by the -1 code of missing values
+    mapping = np.full(len(labels) + 1, -1, dtype=int)
+    mapping[used] = np.arange(len(used))
+    return mapping[codes], [labels[c] for c in used]
+
+
+def one_hot(codes, num_labels):
+    """Returns a (len(codes), num_labels) integer matrix with a single one in
+    each row at the code's column. Rows with a code of -1 are all zeros."""
+    matrix = np.zeros((len(codes), num_labels), dtype=int)
+    present = codes >= 0
+    matrix[np.flatnonzero(present), codes[present]] = 1
+    return matrix
+
+
+def team_label_counts(teams, codes, num_teams, num_labels):
+    """Returns the number of members of each team that have each label.
+
+    Parameters
+    ==========
+    teams : array_like, shape(n,) or shape(m, n)
+        The team index of each of the n students, -1 if unassigned. A two
+        dimensional array holds m candidate assignments.
+    codes : array_like, shape(n,) or shape(n, k)
+        The label code of each student, -1 if missing. A two dimensional array
+        holds k labels per student, e.g. ranked project choices.
+    num_teams : integer
+        The number of teams.
+    num_labels : integer
+        The number of distinct labels.
+
+    Returns
+    =======
+    counts : ndarray, shape(num_teams, num_labels) or shape(m, num_teams,
+             num_labels)
+
+    """
+    teams = np.asarray(teams)
+    codes = np.asarray(codes)
+    batch = teams.reshape(-1, teams.shape[-1])
+    num_rows, num_students = batch.shape
+    per_student = codes.reshape(num_students, -1)
+    k = per_student.shape[1]
+
+    # one flat bin per (assignment, team, label)
+    row_teams = batch + (np.arange(num_rows) * num_teams)[:, np.newaxis]
+    row_teams = np.repeat(row_teams, k, axis=1)
+    row_codes = np.tile(per_student.ravel(), num_rows)
+    keep = (np.repeat(batch, k, axis=1).ravel() >= 0) & (row_codes >= 0)
+    bins = row_teams.ravel()[keep] * num_labels + row_codes[keep]
+    counts = np.bincount(bins, minlength=num_rows * num_teams * num_labels)
+
+    return counts.reshape(teams.shape[:-1] + (num_teams, num_labels))
+
+
+def team_sizes(teams, num_teams):
+    """Returns the number of members of each team, with the same batch
+    support as ``team_label_counts()``."""
+    teams = np.asarray(teams)
+    zeros = np.zeros(teams.shape[-1], dtype=int)
+    return team_label_counts(teams, zeros, num_teams, 1)[..., 0]
+
+
+def distinct_label_scores(teams, codes, num_teams, num_labels):
+    """Returns the number of distinct labels among the members of each team
+    divided by the team size, i.e. the MultipleChoiceSingleAnswerQuestion
+    score, with the same batch support as ``team_label_counts()``. Members
+    with a code of -1 count towards the size but not the distinct labels."""
+    counts = team_label_counts(teams, codes, num_teams, num_labels)
+    distinct = (counts > 0).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return distinct / team_sizes(teams, num_teams)
+
+
+class EncodedStudents(object):
+    """Integer encoded attributes of a group of students, i.e. a column of
+    codes for each attribute plus the list of labels the codes index."""
+
+    def __init__(self, students, project_ids=None):
+        """
+        Parameters
+        ==========
+        students : iterable of Person
+            The students, their order defines the student indices.
+        project_ids : iterable of string, optional
+            The projects the choices are encoded against. If not given, all
+            of the selected projects are used in order of first appearance.
+
+        """
+        students = list(students)
+        self.names = [p.name for p in students]
+        self.responded = np.array([p.selections is not None for p in
+                                   students], dtype=bool)
+        self.genders, self.gender_labels = _encode([p.gender for p in
+                                                    students])
+        self.races, self.race_labels = _encode([p.race for p in students])
+        self.sections, self.section_labels = _encode(
+            [p.original_section for p in students])
+        self.willing_to_switch = np.array([bool(p.willing_to_switch) for p in
+                                           students])
+        self.gpas = np.array([_numeric_gpa(p.gpa) for p in students],
+                             dtype=float)
+
+        self.choices, self.project_ids = encode_choices(
+            [p.selections for p in students], project_ids)
+        self.response_lengths = np.array([len(p.selections or []) for p in
+                                          students], dtype=int)
+
+    @classmethod
+    def from_tables(cls, roster, catme_data, project_ids=None):
+        """Returns the encoded students of the roster joined with their
+        survey responses, the same as encoding the students of
+        ``populate_students()`` but without creating a Person for each.
+        This is fastest with the categorical columns of ``read_catme()``.
+
+        Parameters
+        ==========
+        roster : pandas.DataFrame
+            Columns: Name, ID, email, Section
+        catme_data : pandas.DataFrame
+            The CATME export, see ``read_catme()``.
+        project_ids : iterable of string, optional
+            See ``EncodedStudents()``.
+
+        """
+        catme = catme_data.reset_index(drop=True)
+        match = _match_responses(roster, catme)
+        responded = match >= 0
+
+        def categorical(values):
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype('category')
+            return values
+
+        def codes_of(values):
+            values = categorical(values)
+            codes = values.cat.codes.to_numpy().astype(int)
+            # the appended entry is picked by the -1 of students without a
+            # response
+            codes = np.append(codes, -1)[match]
+            return _relabel_by_appearance(codes,
+                                          list(values.cat.categories))
+
+        self = cls.__new__(cls)
+        self.names = roster['Name'].tolist()
+        self.responded = responded
+        self.genders, self.gender_labels = codes_of(catme['Sex'])
+        self.races, self.race_labels = codes_of(catme['Race'])
+        sections = categorical(roster['Section'])
+        self.sections, self.section_labels = _relabel_by_appearance(
+            np.where(responded, sections.cat.codes.to_numpy(), -1),
+            list(sections.cat.categories))
+        switch = (catme['Studio Switch'] == 'Yes').to_numpy(dtype=bool)
+        self.willing_to_switch = np.append(switch, False)[match]
+        gpas = pd.to_numeric(catme['GPA'], errors='coerce').to_numpy(
+            dtype=float)
+        self.gpas = np.append(gpas, np.nan)[match]
+
+        labels = _Categories(clean=_clean_project_id)
+        choices = np.full((len(catme) + 1, len(CHOICE_COLUMNS)), -1,
+                          dtype=int)
+        for j, col in enumerate(CHOICE_COLUMNS):
+            choices[:-1, j] = labels.encode(categorical(catme[col]))
+        choices = choices[match]
+        # skipped choices are dropped, moving the later choices up
+        order = np.argsort(choices < 0, axis=1, kind='stable')
+        choices = np.take_along_axis(choices, order, axis=1)
+        self.response_lengths = (choices >= 0).sum(axis=1)
+        choices = choices[:, :self.response_lengths.max(initial=0)]
+        if project_ids is None:
+            choices, self.project_ids = _relabel_by_appearance(
+                choices, labels.labels)
+        else:
+            self.project_ids = list(project_ids)
+            lookup = {proj_id: i for i, proj_id in
+                      enumerate(self.project_ids)}
+            mapping = np.array([lookup.get(label, -1) for label in
+                                labels.labels] + [-1], dtype=int)
+            choices = mapping[choices]
+        self.choices = choices
+        return self
+
+    def __len__(self):
+        return len(self.names)
+
+    def num_choices(self):
+        """Returns the number of ranked choices each student made, including
+        those of projects that are not in project_ids."""
+        return self.response_lengths
+
+    def in_groups(self, codes, labels, groups):
+        """Returns a boolean array over the students that is True for those
+        whose code's label is in groups."""
+        groups = set(groups)
+        # the extra False entry is picked by the -1 code of missing values
+        mask = np.array([label in groups for label in labels] + [False],
+                        dtype=bool)
+        return mask[codes]
+
+
+def _smallest_int(num_labels):
+    """Returns the smallest signed integer dtype that holds the codes -1 to
+    num_labels - 1."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if num_labels <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class PersonPool(EncodedStudents):
+    """A compact store of a large number of students. Each attribute is an
+    array over the students (a student's id is their index) with the text
+    attributes stored as codes of the smallest integer type, and Person
+    objects are only created when asked for.
+
+    A Person, with its selections list and strings, takes several hundred
+    bytes while a student in the pool takes tens of bytes, most of it the
+    name."""
+
+    def __init__(self, students, project_ids=None):
+        """
+        Parameters
+        ==========
+        students : iterable of Person
+            The students, their order defines the student ids.
+        project_ids : iterable of string, optional
+            See ``EncodedStudents()``.
+
+        """
+        super(PersonPool, self).__init__(students, project_ids)
+        self._compact()
+
+    @classmethod
+    def from_tables(cls, roster, catme_data, project_ids=None):
+        """Returns the pool of the roster's students, see
+        ``EncodedStudents.from_tables()``."""
+        pool = super(PersonPool, cls).from_tables(roster, catme_data,
+                                                  project_ids)
+        pool._compact()
+        return pool
+
+    def _compact(self):
+        self.ids = np.arange(len(self.names), dtype=_smallest_int(
+            len(self.names)))
+        self.genders = self.genders.astype(_smallest_int(
+            len(self.gender_labels)))
+        self.races = self.races.astype(_smallest_int(len(self.race_labels)))
+        self.sections = self.sections.astype(_smallest_int(
+            len(self.section_labels)))
+        self.choices = self.choices.astype(_smallest_int(
+            len(self.project_ids)))
+        self.response_lengths = self.response_lengths.astype(_smallest_int(
+            self.choices.shape[1]))
+        self._ids_by_name = None
+
+    def nbytes(self):
+        """Returns the number of bytes used by the attribute arrays, not
+        counting the names and labels."""
+        return sum(a.nbytes for a in [self.ids, self.responded, self.genders,
+                                      self.races, self.sections,
+                                      self.willing_to_switch, self.gpas,
+                                      self.choices, self.response_lengths])
+
+    def index(self, name):
+        """Returns the id of the student with the name."""
+        if self._ids_by_name is None:
+            self._ids_by_name = {n: i for i, n in enumerate(self.names)}
+        try:
+            return self._ids_by_name[name]
+        except KeyError:
+            raise ValueError('{} is not in the pool.'.format(name))
+
+    def person(self, student_id):
+        """Returns a new Person with the attributes of the student. Changing
+        the Person does not change the pool."""
+        i = student_id
+
+        def label(codes, labels):
+            code = codes[i]
+            return labels[code] if code >= 0 else None
+
+        responded = bool(self.responded[i])
+        gpa = self.gpas[i]
+        selections = None
+        if responded:
+            selections = [self.project_ids[c] for c in self.choices[i]
+                          if c >= 0]
+        return Person(self.names[i],
+                      label(self.sections, self.section_labels),
+                      bool(self.willing_to_switch[i]) if responded else None,
+                      label(self.genders, self.gender_labels),
+                      selections,
+                      None if np.isnan(gpa) else float(gpa),
+                      label(self.races, self.race_labels))
+
+    def people(self, student_ids=None):
+        """Yields a Person for each of the students, by default all of them
+        in id order."""
+        if student_ids is None:
+            student_ids = range(len(self))
+        for i in student_ids:
+            yield self.person(i)
+
+
+class TeamAssignment(object):
+    """An assignment of encoded students to teams stored as a vector of team
+    indices, with every team scored for a criterion in a single vectorized
+    pass."""
+
+    def __init__(self, students, teams, num_teams=None, team_sections=None):
+        """
+        Parameters
+        ==========
+        students : EncodedStudents
+            The students being assigned.
+        teams : array_like of integer, shape(n,)
+            The team index of each student, -1 if unassigned.
+        num_teams : integer, optional
+            The number of teams, defaults to one more than the largest index.
+        team_sections : array_like of integer, shape(num_teams,), optional
+            The section code, as in ``students.section_labels``, each team
+            meets in.
+
+        """
+        self.students = students
+        self.teams = np.array(teams, dtype=int)
+        if num_teams is None:
+            num_teams = int(self.teams.max()) + 1 if len(self.teams) else 0
+        self.num_teams = num_teams
+        if team_sections is None:
+            team_sections = np.full(num_teams, -1, dtype=int)
+        self.team_sections = np.asarray(team_sections, dtype=int)
+
+    @classmethod
+    def from_teams(cls, students, teams):
+        """Returns the assignment represented by a list of Team objects."""
+        lookup = {name: i for i, name in enumerate(students.names)}
+        assignment = np.full(len(students), -1, dtype=int)
+        section_lookup = {s: i for i, s in enumerate(students.section_labels)}
+        team_sections = np.full(len(teams), -1, dtype=int)
+        for t, team in enumerate(teams):
+            team_sections[t] = section_lookup.get(team.section(), -1)
+            for member in team.members:
+                assignment[lookup[member.name]] = t
+        return cls(students, assignment, len(teams), team_sections)
+
+    def sizes(self):
+        """Returns the number of members of each team."""
+        assigned = self.teams[self.teams >= 0]
+        return np.bincount(assigned, minlength=self.num_teams)
+
+    def counts(self, codes, num_labels):
+        """Returns the (num_teams, num_labels) member counts of a coded
+        attribute."""
+        return team_label_counts(self.teams, codes, self.num_teams,
+                                 num_labels)
+
+    def gender_counts(self):
+        return self.counts(self.students.genders,
+                           len(self.students.gender_labels))
+
+    def race_counts(self):
+        return self.counts(self.students.races,
+                           len(self.students.race_labels))
+
+    def section_counts(self):
+        return self.counts(self.students.sections,
+                           len(self.students.section_labels))
+
+    def choice_counts(self):
+        """Returns the (num_teams, num_projects) number of members of each
+        team that chose each project."""
+        return self.counts(self.students.choices,
+                           len(self.students.project_ids))
+
+    def mean_gpas(self):
+        """Returns the mean reported GPA of each team, NaN if none."""
+        gpas = self.students.gpas
+        keep = (self.teams >= 0) & ~np.isnan(gpas)
+        sums = np.bincount(self.teams[keep], weights=gpas[keep],
+                           minlength=self.num_teams)
+        nums = np.bincount(self.teams[keep], minlength=self.num_teams)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / nums
+
+    def section_conflicts(self):
+        """Returns a boolean array that is True for students placed on a team
+        meeting in a section they can't attend."""
+        assigned = self.teams >= 0
+        team_section = np.where(assigned,
+                                self.team_sections[np.where(assigned,
+                                                            self.teams, 0)],
+                                -1)
+        return (assigned & (team_section >= 0) &
+                ~self.students.willing_to_switch &
+                (team_section != self.students.sections))
+
+    def score_multiple_choice(self, codes, num_choices):
+        """Returns the MultipleChoiceSingleAnswerQuestion score of every team,
+        i.e. the number of distinct answers over the team size."""
+        return distinct_label_scores(self.teams, codes, self.num_teams,
+                                     num_choices)
+
+    def score_underrepresented(self, underrep_groups):
+        """Returns the UnderrepresentedMemberQuestion score of every team
+        based on the members' gender and race."""
+        s = self.students
+        underrep = (s.in_groups(s.genders, s.gender_labels, underrep_groups) |
+                    s.in_groups(s.races, s.race_labels, underrep_groups))
+        num = self.counts(underrep.astype(int), 2)[:, 1]
+        return np.select([num == 0, num == 1], [0, -1], 1)
+
+    def score_project_fit(self, team_projects, ordered=False):
+        """Returns the ProjectRankQuestion score of every team for the project
+        index in team_projects it is assigned to."""
+        team_projects = np.asarray(team_projects, dtype=int)
+        sizes = self.sizes()
+        assigned = self.teams >= 0
+        project = np.full(len(self.teams), -1, dtype=int)
+        project[assigned] = team_projects[self.teams[assigned]]
+        hits = (self.students.choices == project[:, np.newaxis]) & \
+            (project[:, np.newaxis] >= 0) & assigned[:, np.newaxis]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if not ordered:
+                chose = hits.any(axis=1).astype(float)
+                num = np.bincount(self.teams[assigned],
+                                  weights=chose[assigned],
+                                  minlength=self.num_teams)
+                return num / sizes
+            # the rank of a choice is the team's longest response length minus
+            # its position in the response, the last position of a project
+            # chosen twice as in ProjectRankQuestion.compute_score()
+            max_rank = np.zeros(self.num_teams, dtype=int)
+            np.maximum.at(max_rank, self.teams[assigned],
+                          self.students.num_choices()[assigned])
+            last = hits.shape[1] - 1 - hits[:, ::-1].argmax(axis=1)
+            position = np.where(hits.any(axis=1), last, -1)
+            has = assigned & (position >= 0)
+            ranks = max_rank[self.teams[has]] - position[has]
+            total = np.bincount(self.teams[has], weights=ranks,
+                                minlength=self.num_teams)
+            return total / sizes / max_rank
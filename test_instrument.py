@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+import instrument
+from instrument import Recorder
+
+
+@pytest.fixture(autouse=True)
+def disabled():
+    yield
+    instrument.disable()
+    instrument.RECORDER.reset()
+
+
+def test_recorder():
+
+    recorder = Recorder()
+
+    # nothing is recorded while disabled
+    with recorder.stage('load'):
+        pass
+    recorder.count('swaps')
+    assert recorder.report() == {'stages': {}, 'counters': {}}
+
+    recorder.enabled = True
+    for _ in range(3):
+        with recorder.stage('load'):
+            pass
+    recorder.count('swaps', 5)
+    recorder.count('swaps')
+
+    report = recorder.report()
+    assert report['stages']['load']['calls'] == 3
+    assert report['stages']['load']['seconds'] >= 0.0
+    assert report['counters'] == {'swaps': 6}
+    assert 'load' in recorder.summary()
+
+    # an exception still ends the stage
+    with pytest.raises(ValueError):
+        with recorder.stage('fail'):
+            raise ValueError()
+    assert recorder.report()['stages']['fail']['calls'] == 1
+
+
+def test_timed(tmp_path):
+
+    @instrument.timed('double')
+    def double(x):
+        """Doubles."""
+        return 2 * x
+
+    assert double(2) == 4
+    assert double.__doc__ == 'Doubles.'
+    assert instrument.report()['stages'] == {}
+
+    instrument.enable()
+    assert double(3) == 6
+    instrument.count('calls')
+    path = str(tmp_path / 'profile.json')
+    instrument.dump(path)
+    with open(path) as f:
+        profile = json.load(f)
+    assert profile['stages']['double']['calls'] == 1
+    assert profile['counters'] == {'calls': 1}
+
+    # enabling again starts a fresh profile
+    instrument.enable()
+    assert instrument.report() == {'stages': {}, 'counters': {}}
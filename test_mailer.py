@@ -0,0 +1,147 @@
+import json
+import time
+import socket
+import smtplib
+
+import pytest
+
+from mailer import Mailer, Journal, is_transient, message_key
+from team_emails import TeamEmail
+
+controller = pytest.importorskip('aiosmtpd.controller')
+
+
+class Handler(object):
+    """Stand-in SMTP server that replies to the first messages with the
+    given replies, accepting the message for a None."""
+
+    def __init__(self, replies=()):
+        self.replies = list(replies)
+        self.messages = []
+        self.peers = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.peers.add(session.peer)
+        if self.replies and self.replies[0] is not None:
+            return self.replies.pop(0)
+        elif self.replies:
+            self.replies.pop(0)
+        self.messages.append(envelope)
+        return '250 OK'
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    port = free_port()
+    handler = Handler()
+    smtpd = controller.Controller(handler, hostname='127.0.0.1', port=port)
+    smtpd.start()
+    yield handler, port
+    smtpd.stop()
+
+
+def make_emails(n=3):
+    return [TeamEmail('acceptance', 'p{}'.format(i), 'Team {}'.format(i),
+                      ['s{}@x.edu'.format(i), 'sponsor@x.com'],
+                      'Team {}\n=======\n\nHello *team*.\n'.format(i))
+            for i in range(n)]
+
+
+def test_is_transient():
+    assert is_transient(smtplib.SMTPServerDisconnected())
+    assert is_transient(ConnectionRefusedError())
+    assert is_transient(smtplib.SMTPDataError(451, 'later'))
+    assert not is_transient(smtplib.SMTPDataError(550, 'no'))
+    assert not is_transient(smtplib.SMTPRecipientsRefused(
+        {'a@x.edu': (450, 'busy'), 'b@x.edu': (550, 'no')}))
+
+
+def test_mailer(server, tmp_path):
+
+    handler, port = server
+    journal = str(tmp_path / 'sent.jsonl')
+    emails = make_emails(5)
+
+    mailer = Mailer('127.0.0.1', port, 'ta@x.edu', connections=2,
+                    backoff=0.0, journal=journal)
+    deliveries = mailer.send_all(emails)
+
+    assert [d.status for d in deliveries] == ['sent'] * 5
+    assert [d.key for d in deliveries] == [message_key(e) for e in emails]
+    assert len(handler.messages) == 5
+    # the connections are reused
+    assert len(handler.peers) <= 2
+    envelope = handler.messages[0]
+    assert envelope.mail_from == 'ta@x.edu'
+    assert envelope.rcpt_tos[1] == 'sponsor@x.com'
+    content = envelope.content.decode()
+    assert 'Subject: Team' in content
+    assert 'text/html' in content
+
+    # a resumed run skips what was sent
+    with open(journal) as f:
+        assert len(f.readlines()) == 5
+    emails += make_emails(6)[5:]
+    deliveries = Mailer('127.0.0.1', port, 'ta@x.edu',
+                        journal=journal).send_all(emails)
+    assert [d.status for d in deliveries] == ['skipped'] * 5 + ['sent']
+    assert len(handler.messages) == 6
+
+    with pytest.raises(ValueError):
+        mailer.send_all(make_emails(2) * 2)
+    with pytest.raises(ValueError):
+        Mailer('127.0.0.1', port)
+
+
+def test_mailer_failures(server, tmp_path):
+
+    handler, port = server
+    handler.replies = ['451 4.3.0 Try again later', None,
+                       '554 5.7.1 Rejected']
+    emails = make_emails(2)
+    emails.append(emails[0]._replace(project_id='bad',
+                                     rst='Bad\n===\n\n.. nonsense::\n'))
+    journal = str(tmp_path / 'sent.jsonl')
+
+    mailer = Mailer('127.0.0.1', port, 'ta@x.edu', connections=1,
+                    backoff=0.0, journal=journal)
+    deliveries = mailer.send_all(emails)
+
+    assert [(d.status, d.attempts) for d in deliveries] == \
+        [('sent', 2), ('failed', 1), ('failed', 0)]
+    assert 'Rejected' in deliveries[1].error
+    assert 'nonsense' in deliveries[2].error
+    assert Journal(journal).statuses == {'acceptance:p0': 'sent',
+                                         'acceptance:p1': 'failed',
+                                         'acceptance:bad': 'failed'}
+    with open(journal) as f:
+        assert json.loads(f.readline())['attempts'] == 2
+
+    # failed messages are sent again when resuming
+    deliveries = mailer.send_all(emails[:2])
+    assert [d.status for d in deliveries] == ['skipped', 'sent']
+
+    # the server is gone
+    deliveries = Mailer('127.0.0.1', free_port(), 'ta@x.edu', retries=1,
+                        backoff=0.0, timeout=1.0).send_all(emails[:1])
+    assert [(d.status, d.attempts) for d in deliveries] == [('failed', 2)]
+
+
+def test_mailer_rate(server):
+
+    handler, port = server
+    mailer = Mailer('127.0.0.1', port, 'ta@x.edu', connections=2, rate=20.0,
+                    html=False)
+
+    start = time.monotonic()
+    deliveries = mailer.send_all(make_emails(5))
+
+    assert time.monotonic() - start >= 0.2
+    assert [d.status for d in deliveries] == ['sent'] * 5
+    assert 'text/html' not in handler.messages[0].content.decode()
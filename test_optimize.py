@@ -0,0 +1,224 @@
+from itertools import product
+from random import Random
+
+import numpy as np
+import pytest
+
+import instrument
+
+from teamo import (MultipleChoiceSingleAnswerQuestion,
+                   UnderrepresentedMemberQuestion, ProjectRankQuestion,
+                   EncodedStudents, Person, Project, Team)
+from optimize import (MultipleChoiceCriterion, UnderrepresentedCriterion,
+                      ProjectRankCriterion, section_feasibility,
+                      initial_assignment, score_assignment, optimize_teams,
+                      optimize_teams_multistart, assign_projects)
+
+
+def make_people(num_people, project_ids, seed=0, num_choices=5):
+    rng = Random(seed)
+    people = []
+    for i in range(num_people):
+        people.append(Person('Student {}'.format(i),
+                             rng.choice(['A02', 'A03']),
+                             rng.random() < 0.5,
+                             rng.choice(['Male', 'Male', 'Female']),
+                             rng.sample(project_ids, num_choices),
+                             round(rng.uniform(2.0, 4.0), 2),
+                             rng.choice(['Asian', 'White', 'Black',
+                                         'Hispanic'])))
+    return people
+
+
+def make_criteria(people, team_projects, project_ids):
+    gpa_question = MultipleChoiceSingleAnswerQuestion(
+        'GPA?', ['high', 'mid', 'low'])
+    gpas = ['high' if p.gpa > 3.3 else 'mid' if p.gpa > 2.6 else 'low'
+            for p in people]
+    return [MultipleChoiceCriterion(gpa_question, gpas),
+            UnderrepresentedCriterion(
+                UnderrepresentedMemberQuestion(['Female']),
+                [p.gender for p in people], weight=0.5),
+            ProjectRankCriterion(ProjectRankQuestion(project_ids),
+                                 [p.selections for p in people],
+                                 team_projects, ordered=True, weight=2.0)]
+
+
+def test_optimize_teams():
+
+    project_ids = ['p{}'.format(i) for i in range(12)]
+    people = make_people(50, project_ids)
+    num_teams = 10
+    team_projects = project_ids[:num_teams]
+    criteria = make_criteria(people, team_projects, project_ids)
+
+    encoded = EncodedStudents(people, project_ids)
+    team_sections = [i % 2 for i in range(num_teams)]
+    feasible = section_feasibility(encoded, team_sections)
+
+    initial = initial_assignment(len(people), num_teams, feasible, seed=1)
+    assert feasible[np.arange(len(people)), initial].all()
+    initial_score = score_assignment(initial, num_teams, criteria).mean()
+
+    result = optimize_teams(len(people), num_teams, criteria,
+                            initial=initial, feasible=feasible,
+                            max_iterations=5000, seed=1)
+
+    assert result.iterations == 5000
+    assert result.score >= initial_score
+    assert feasible[np.arange(len(people)), result.teams].all()
+    np.testing.assert_array_equal(np.bincount(result.teams), [5] * num_teams)
+
+    # the incrementally updated scores match a full rescoring
+    np.testing.assert_allclose(
+        result.team_scores,
+        score_assignment(result.teams, num_teams, criteria))
+
+    # the same seed gives the same result, with or without instrumentation
+    instrument.enable()
+    try:
+        again = optimize_teams(len(people), num_teams, criteria,
+                               initial=initial, feasible=feasible,
+                               max_iterations=5000, seed=1)
+        counters = instrument.report()['counters']
+    finally:
+        instrument.disable()
+    np.testing.assert_array_equal(again.teams, result.teams)
+    assert counters['optimize.proposals'] == 5000
+    assert (counters['optimize.accepted_moves'] +
+            counters['optimize.accepted_swaps'] == result.accepted)
+    assert counters['optimize.score_evaluations'] >= 2 * result.accepted
+
+
+def test_project_rank_criterion():
+
+    project_ids = ['A', 'B', 'C']
+    # repeated and unknown picks
+    responses = [['A', 'B', 'A'], ['X', 'C', 'B'], ['B', 'B'], [], ['C']]
+    criterion = ProjectRankCriterion(ProjectRankQuestion(project_ids),
+                                     responses, ['A', 'B'], ordered=True)
+    rng = Random(0)
+    for _ in range(20):
+        teams = np.array([rng.randrange(2) for _ in responses])
+        scores = criterion.team_scores(teams, 2)
+        for t in range(2):
+            members = np.flatnonzero(teams == t).tolist()
+            if any(responses[m] for m in members):
+                assert np.isclose(criterion.team_score(t, members),
+                                  scores[t])
+
+
+def test_optimize_teams_uneven_sizes():
+
+    project_ids = ['p{}'.format(i) for i in range(40)]
+    people = make_people(1003, project_ids)
+    num_teams = 200
+    criteria = make_criteria(people, project_ids[:num_teams] * 5,
+                             project_ids)
+
+    result = optimize_teams(len(people), num_teams, criteria,
+                            max_iterations=20000, patience=5000, seed=2)
+
+    sizes = np.bincount(result.teams, minlength=num_teams)
+    assert sizes.min() >= 5
+    assert sizes.max() <= 6
+    assert sizes.sum() == len(people)
+    np.testing.assert_allclose(
+        result.team_scores,
+        score_assignment(result.teams, num_teams, criteria))
+
+    # a single team is scored as is
+    criteria = make_criteria(people[:3], project_ids[:1], project_ids)
+    result = optimize_teams(3, 1, criteria)
+    np.testing.assert_array_equal(result.teams, [0, 0, 0])
+    assert result.iterations == 0
+    np.testing.assert_allclose(result.team_scores,
+                               score_assignment(result.teams, 1, criteria))
+    with pytest.raises(ValueError):
+        optimize_teams(3, 0, criteria)
+
+
+def test_optimize_teams_multistart():
+
+    project_ids = ['p{}'.format(i) for i in range(12)]
+    people = make_people(40, project_ids)
+    num_teams = 8
+    criteria = make_criteria(people, project_ids[:num_teams], project_ids)
+
+    result = optimize_teams_multistart(len(people), num_teams, criteria,
+                                       num_starts=4, workers=2, seed=7,
+                                       max_iterations=2000)
+
+    assert len(result.seeds) == len(result.scores) == 4
+    assert result.best.score == result.scores.max()
+
+    # reproducible from the master seed, in or out of the process pool
+    serial = optimize_teams_multistart(len(people), num_teams, criteria,
+                                       num_starts=4, workers=1, seed=7,
+                                       max_iterations=2000)
+    assert serial.seeds == result.seeds
+    np.testing.assert_array_equal(serial.scores, result.scores)
+    np.testing.assert_array_equal(serial.best.teams, result.best.teams)
+
+    single = optimize_teams(len(people), num_teams, criteria,
+                            max_iterations=2000, seed=result.seeds[0])
+    assert single.score == result.scores[0]
+
+
+def test_assign_projects():
+
+    project_ids = ['a', 'b', 'c']
+    people = make_people(7, project_ids, seed=3, num_choices=2)
+    projects = [Project(p, p.upper()) for p in project_ids]
+
+    result = assign_projects(people, projects, 2, 3, assign_all=False)
+
+    # compare with every possible placement
+    best = None
+    for placement in product(range(len(projects)), repeat=len(people)):
+        sizes = np.bincount(placement, minlength=len(projects))
+        if sizes.min() < 2 or sizes.max() > 3:
+            continue
+        choices = [people[i].selections for i in range(len(people))]
+        if any(project_ids[j] not in choices[i]
+               for i, j in enumerate(placement)):
+            continue
+        cost = sum(choices[i].index(project_ids[j])
+                   for i, j in enumerate(placement))
+        if best is None or cost < best:
+            best = cost
+    assert best is not None
+    assert result.cost == best
+    assert result.unassigned == []
+    for proj_id, members in result.members.items():
+        assert 2 <= len(members) <= 3
+        assert all(proj_id in m.selections for m in members)
+
+
+def test_assign_projects_sections_and_fixed_members():
+
+    project_ids = ['p{}'.format(i) for i in range(10)]
+    people = make_people(60, project_ids, seed=4)
+    fixed = [p for p in people if not p.willing_to_switch][:2]
+    pool = [p for p in people if p not in fixed]
+
+    projects = [Project(p, p.upper()) for p in project_ids]
+    projects[0].team = Team(fixed[:1])
+    projects[1].team = Team(fixed[1:])
+    sections = {p: 'A02' if i % 2 else 'A03'
+                for i, p in enumerate(project_ids[2:], 2)}
+
+    result = assign_projects(pool, projects, 5, 7, project_sections=sections)
+
+    assert result.unassigned == []
+    for project in projects:
+        members = result.members[project.id]
+        section = sections.get(project.id, project.team and
+                               project.team.section())
+        assert all(m.can_attend(section) for m in members)
+        current = project.team.num_members() if project.team else 0
+        assert 5 <= len(members) + current <= 7
+
+    # there is no room for everybody
+    result = assign_projects(pool, projects[:3], 5, 7)
+    assert len(result.unassigned) == len(pool) - 19
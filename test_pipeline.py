@@ -0,0 +1,127 @@
+import os
+import json
+from random import Random
+
+import pandas as pd
+import pytest
+
+import pipeline
+from pipeline import Pipeline, load_config
+
+PROJECT_RST = """\
+{title}
+{underline}
+
+:id: {id}
+:title: {title}
+
+A description of the project.
+"""
+
+
+@pytest.fixture
+def config_path(tmp_path, monkeypatch):
+
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    rng = Random(0)
+
+    project_dir = tmp_path / 'projects'
+    project_dir.mkdir()
+    project_ids = ['p{}'.format(i) for i in range(8)]
+    for proj_id in project_ids:
+        title = 'Project {}'.format(proj_id)
+        with open(str(project_dir / (proj_id + '.rst')), 'w') as f:
+            f.write(PROJECT_RST.format(title=title, id=proj_id,
+                                       underline='=' * len(title)))
+
+    names = ['Student {}'.format(i) for i in range(30)]
+    sections = [rng.choice(['A02', 'A03']) for _ in names]
+    sections[:2] = ['A02', 'A02']  # on the fixed team
+    pd.DataFrame({'Name': names, 'ID': range(30), 'Section': sections}).\
+        to_csv(str(tmp_path / 'roster.csv'), index=False)
+    rows = []
+    for i, name in enumerate(names[:-2]):  # two didn't fill out the survey
+        row = {'Name': name, 'Student ID': i, 'Studio Section': sections[i],
+               'Studio Switch': 'No' if i < 2 else rng.choice(['Yes', 'No']),
+               'Sex': rng.choice(['Male', 'Female']),
+               # the GPA question's answers can be text
+               'GPA': 'a) 4.0-3.5' if i % 2 else 3.0, 'Race': 'White'}
+        for k, proj_id in enumerate(rng.sample(project_ids[:6], 5)):
+            row['Project Choice #{}'.format(k + 1)] = proj_id
+        rows.append(row)
+    pd.DataFrame(rows).to_csv(str(tmp_path / 'catme.csv'), index=False)
+
+    with open(str(tmp_path / 'fixed.yml'), 'w') as f:
+        f.write('p7:\n- Student 0\n- Student 1\n')
+
+    path = tmp_path / 'config.yml'
+    with open(str(path), 'w') as f:
+        f.write('\n'.join(['roster: roster.csv',
+                           'catme: catme.csv',
+                           'projects: projects',
+                           'fixed_teams: fixed.yml',
+                           'output: matches.csv',
+                           'min_team_size: 4',
+                           'max_num_teams: 6',
+                           'max_num_teams_per_section: 3',
+                           'remove_projects: [p0]']))
+    return str(path)
+
+
+def test_pipeline(config_path, monkeypatch):
+
+    config = load_config(config_path)
+    Pipeline(config).run()
+
+    matches = pd.read_csv(config['output'], index_col=0)
+    assert len(matches) == 30
+    assert 'p0' not in set(matches['Project'])
+    assert set(matches.loc[['Student 0', 'Student 1'], 'Project']) == {'p7'}
+    assert matches.groupby('Project').size().between(4, 6).all()
+
+    # rerunning the assignment reuses the earlier stages
+    def fail(self):
+        raise AssertionError('stage should have been reused')
+
+    monkeypatch.setattr(Pipeline, 'run_load', fail)
+    monkeypatch.setattr(Pipeline, 'run_rank', fail)
+    monkeypatch.setattr(Pipeline, 'run_select', fail)
+    teams = Pipeline(load_config(config_path)).run('assign')['teams']
+    assert sum(t.num_members() for t in teams.values()) == 30
+
+    # changing a selection setting invalidates the selection but not the
+    # loaded data
+    monkeypatch.undo()
+    monkeypatch.setattr(Pipeline, 'run_load', fail)
+    config = load_config(config_path)
+    config['remove_projects'] = ['p1']
+    selected = Pipeline(config).run('select')['selected']
+    assert 'p1' not in selected
+    assert 'p0' in selected
+
+
+def test_main(config_path):
+
+    pipeline.main([config_path, 'rank'])
+    config = load_config(config_path)
+    assert os.path.exists(os.path.join(config['work_dir'], 'rank.pickle'))
+    assert not os.path.exists(config['output'])
+
+
+def test_main_profile(config_path, tmp_path):
+
+    profile_path = str(tmp_path / 'profile.json')
+    pipeline.main([config_path, '--profile', profile_path])
+    with open(profile_path) as f:
+        profile = json.load(f)
+    assert set(profile['stages']).issuperset(
+        ['load', 'rank', 'select', 'assign', 'export', 'load.students',
+         'load.projects', 'assign.flow'])
+    assert profile['counters']['load.projects.cache_misses'] == 8
+
+    # the stored stages are reused, only the export runs
+    pipeline.main([config_path, '--profile', profile_path])
+    with open(profile_path) as f:
+        profile = json.load(f)
+    assert set(profile['stages']) == {'export'}
+    assert profile['counters']['stages.reused'] == 4
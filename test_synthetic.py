@@ -0,0 +1,44 @@
+import pandas as pd
+
+from teamo import (CHOICE_COLUMNS, populate_students, populate_projects,
+                   rank_projects_weighted)
+from synthetic import generate_cohort, generate_survey, generate_project_ids
+
+
+def test_generate_survey():
+
+    project_ids = generate_project_ids(30)
+    roster, catme = generate_survey(500, project_ids, response_rate=0.9,
+                                    seed=1)
+
+    assert len(roster) == 500
+    assert roster['Name'].is_unique
+    assert 400 < len(catme) < 500
+    assert set(catme['Name']).issubset(set(roster['Name']))
+
+    choices = catme[CHOICE_COLUMNS]
+    assert choices.isin(project_ids).all().all()
+    # no project is chosen twice by the same student
+    assert (choices.nunique(axis=1) == 5).all()
+
+    # the same seed gives the same class
+    again_roster, again_catme = generate_survey(500, project_ids,
+                                                response_rate=0.9, seed=1)
+    pd.testing.assert_frame_equal(catme, again_catme)
+
+
+def test_generate_cohort(tmp_path):
+
+    cohort = generate_cohort(str(tmp_path), num_students=60, num_projects=12,
+                             seed=2)
+
+    roster = pd.read_csv(cohort.roster)
+    catme = pd.read_csv(cohort.catme)
+    students = populate_students(roster, catme)
+    projects = populate_projects(cohort.project_dir)
+
+    assert len(students) == 60
+    assert sorted(projects) == cohort.project_ids
+    responded = [s for s in students.values() if s.selections]
+    assert all(len(s.selections) == 5 for s in responded)
+    assert len(rank_projects_weighted(students, projects)) > 0
@@ -0,0 +1,176 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import team_emails
+from team_emails import (acceptance_emails, rejection_emails, funding_emails,
+                         generate_emails, index_sponsors, render_emails)
+
+
+def make_tables():
+    students = pd.DataFrame({
+        'Name': ['Doe, Jane', 'Roe, Rick', 'Poe, Pat', 'Loe, Lou'],
+        'Email': ['jane@x.edu', 'rick@x.edu', 'pat@x.edu', 'lou@x.edu'],
+        'Project ID': ['boat', 'car', 'boat', 'car'],
+        'Project Section': ['A02', 'A03', 'A02', 'A03'],
+        'Switched': [False, True, False, False],
+        'TA': ['Lyons, Ken', 'Chen, Gary', 'Lyons, Ken', 'Chen, Gary'],
+    })
+    sponsors = pd.DataFrame({
+        'ID': ['boat', 'car', 'bike'],
+        'First Name': ['Sam', 'Kim', 'Lee'],
+        'Last Name': ['Smith', 'Kent', 'Long'],
+        'Organization': ['Boats Inc', 'Cars Inc', 'Bikes Inc'],
+        'Email': ['sam@boats.com', 'kim@cars.com', 'lee@bikes.com'],
+        'Phone Number': ['555-0001', '555-0002', '555-0003'],
+        'Project Title': ['A Better Boat', 'A Faster Car', 'A Bike'],
+        'Accepted': ['Yes', 'Yes', 'No'],
+    })
+    return students, sponsors
+
+
+TA_EMAILS = {'Ken Lyons': 'ken@x.edu', 'Gary Chen': 'gary@x.edu'}
+
+
+def test_acceptance_emails(capsys):
+
+    students, sponsors = make_tables()
+
+    emails = acceptance_emails(students, sponsors, TA_EMAILS)
+
+    assert [e.project_id for e in emails] == ['boat', 'car']
+    boat = emails[0]
+    assert boat.kind == 'acceptance'
+    assert boat.recipients == ['jane@x.edu', 'pat@x.edu', 'sam@boats.com',
+                               'ken@x.edu']
+    assert boat.rst.startswith('A Better Boat\n=============\n')
+    assert 'Dear Jane, Pat,' in boat.rst
+    assert 'in **Section A02**' in boat.rst
+    assert '- Doe, Jane [jane@x.edu]\n- Poe, Pat [pat@x.edu]\n' in boat.rst
+    assert 'Your TA consultant is Ken Lyons [ken@x.edu].' in boat.rst
+    assert 'Sam Smith from Boats Inc' in boat.rst
+    assert '- Roe, Rick [rick@x.edu]*\n' in emails[1].rst
+
+    # a student without an address is left out of the recipients
+    missing = students.copy()
+    missing.loc[missing['Email'] == 'pat@x.edu', 'Email'] = np.nan
+    boat = acceptance_emails(missing, sponsors, TA_EMAILS)[0]
+    assert boat.recipients == ['jane@x.edu', 'sam@boats.com', 'ken@x.edu']
+    assert '- Doe, Jane [jane@x.edu]\n- Poe, Pat\n' in boat.rst
+    assert 'has no email address' in capsys.readouterr().out
+
+    # the TA emails can come from the students table
+    students['TA Email'] = ['k@x.edu', 'g@x.edu', 'k@x.edu', 'g@x.edu']
+    sponsors = sponsors.rename(columns={'Project Title': 'Title'})
+    sponsors['Name'] = sponsors['First Name']
+    emails = acceptance_emails(students, sponsors)
+    assert 'Gary Chen [g@x.edu]' in emails[1].rst
+    assert 'Kim from Cars Inc' in emails[1].rst
+
+    del students['TA Email']
+    with pytest.raises(ValueError):
+        acceptance_emails(students, sponsors)
+
+    students.loc[0, 'Project ID'] = 'plane'
+    with pytest.raises(ValueError):
+        acceptance_emails(students, sponsors, TA_EMAILS)
+
+
+def test_rejection_and_funding_emails():
+
+    students, sponsors = make_tables()
+    index = index_sponsors(sponsors)
+    assert index['bike']['name'] == 'Lee Long'
+
+    emails = rejection_emails(students, index, year=2018)
+    assert [e.project_id for e in emails] == ['bike']
+    assert emails[0].subject == \
+        'UCD MAE Capstone Proposal Selection: A Bike'
+    assert emails[0].recipients == ['lee@bikes.com']
+    assert 'for the 2018 UCD MAE' in emails[0].rst
+    assert ('accepted 2 of 3 proposals for teams of 2 to 2 students.' in
+            emails[0].rst)
+
+    emails = funding_emails(students, index)
+    assert [e.recipients for e in emails] == [['sam@boats.com'],
+                                              ['kim@cars.com']]
+
+
+def test_main(tmp_path):
+
+    students, sponsors = make_tables()
+    students['TA Email'] = 'ta@x.edu'
+    students.to_csv(str(tmp_path / 'students.csv'), index=False)
+    sponsors.to_csv(str(tmp_path / 'sponsors.csv'), index=False)
+    out_dir = str(tmp_path / 'emails')
+
+    team_emails.main([str(tmp_path / 'students.csv'),
+                      str(tmp_path / 'sponsors.csv'), out_dir,
+                      '--year', '2019'])
+
+    expected = generate_emails(students, sponsors, year=2019)
+    for kind in ['acceptance', 'rejection', 'funding']:
+        with open(os.path.join(out_dir, kind + '-emails.rst')) as f:
+            assert f.read() == ''.join(e.rst for e in expected[kind])
+
+    # without a TA Email column the addresses are given as options
+    del students['TA Email']
+    students.to_csv(str(tmp_path / 'students.csv'), index=False)
+    team_emails.main([str(tmp_path / 'students.csv'),
+                      str(tmp_path / 'sponsors.csv'), out_dir,
+                      '--year', '2019',
+                      '--ta-email', 'Lyons, Ken=ken@x.edu',
+                      '--ta-email', 'Gary Chen = gary@x.edu'])
+    expected = generate_emails(students, sponsors, TA_EMAILS, year=2019)
+    with open(os.path.join(out_dir, 'acceptance-emails.rst')) as f:
+        assert f.read() == ''.join(e.rst for e in expected['acceptance'])
+
+    with pytest.raises(SystemExit):
+        team_emails.main([str(tmp_path / 'students.csv'),
+                          str(tmp_path / 'sponsors.csv'), out_dir,
+                          '--ta-email', 'ken@x.edu'])
+
+
+def test_render_emails(tmp_path):
+
+    students, sponsors = make_tables()
+    students.loc[0, 'Name'] = 'Núñez, José'
+    emails = generate_emails(students, sponsors, ta_emails=TA_EMAILS,
+                             year=2019)
+    emails = [e for kind in ['acceptance', 'rejection', 'funding']
+              for e in emails[kind]]
+    broken = emails[1]._replace(project_id='car/x',
+                                rst='Title\n=====\n\n.. nonsense::\n')
+    emails.append(broken)
+
+    out_dir = str(tmp_path / 'serial')
+    rendered = render_emails(emails, out_dir)
+
+    assert rendered.paths[0] == os.path.join(out_dir, 'acceptance-boat.html')
+    assert rendered.paths[-1] is None
+    assert [(e, 'nonsense' in error) for e, error in rendered.failed] == \
+        [(broken, True)]
+    with open(rendered.paths[0], encoding='utf-8') as f:
+        page = f.read()
+    assert 'A Better Boat</h1>' in page
+    assert 'Section A02' in page
+    assert 'Dear José, Pat,' in page
+    assert 'charset=utf-8' in page
+    with open(os.path.join(out_dir, 'acceptance-emails.html'),
+              encoding='utf-8') as f:
+        page = f.read()
+    assert 'A Better Boat' in page and 'A Faster Car' in page
+    with open(rendered.index, encoding='utf-8') as f:
+        index = f.read()
+    assert 'href="rejection-bike.html"' in index
+    assert 'lee@bikes.com' in index
+    assert 'car/x' in index
+
+    parallel = render_emails(emails, str(tmp_path / 'parallel'), workers=2)
+    assert parallel.failed == rendered.failed
+    for path in sorted(os.listdir(out_dir)):
+        with open(os.path.join(out_dir, path), 'rb') as f, \
+                open(str(tmp_path / 'parallel' / path), 'rb') as g:
+            assert f.read() == g.read()
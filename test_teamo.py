@@ -1,6 +1,22 @@
+import os
+import sys
+import subprocess
+from random import Random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import teamo
+
 from teamo import (MultipleChoiceSingleAnswerQuestion,
                    UnderrepresentedMemberQuestion, ProjectRankQuestion,
-                   compute_num_teams)
+                   compute_num_teams, populate_students, read_catme,
+                   rank_projects, rank_projects_weighted,
+                   RankingAccumulator,
+                   populate_projects, Person, PersonPool, Project, Team,
+                   StudentPool, SectionIndex, ChoiceIndex, EncodedStudents,
+                   TeamAssignment, team_label_counts)
 
 
 def test_num_teams():
@@ -125,3 +141,692 @@ def test_multiple_choice_single_answer_question():
                  "b) 3.4-2.8"]
 
     assert q.compute_score(responses) == 1.0 / 5.0
+
+
+def test_populate_students():
+
+    roster = pd.DataFrame({'Name': ['Doe, Jane', 'Roe, Rick', 'Poe, Pat'],
+                           'ID': [1, 2, 3],
+                           'Section': ['A02', 'A03', 'A02']})
+    catme = pd.DataFrame({
+        'Name': ['Roe, Richard', 'Doe, Jane'],
+        'Student ID': [2, 99],
+        'Project Choice #1': ['Boat ', np.nan],
+        'Project Choice #2': ['car', np.nan],
+        'Project Choice #3': ['Bike', np.nan],
+        'Project Choice #4': ['plane', np.nan],
+        'Project Choice #5': [np.nan, np.nan],
+        'Studio Section': ['A03', 'A03'],
+        'Studio Switch': ['Yes', 'No'],
+        'Sex': ['Male', 'Female'],
+        'GPA': [3.2, 3.9],
+        'Race': ['White', 'Asian']})
+
+    students = populate_students(roster, catme)
+
+    assert list(students.keys()) == ['Doe, Jane', 'Roe, Rick', 'Poe, Pat']
+
+    # matched by ID even though the name differs
+    rick = students['Roe, Rick']
+    assert rick.selections == ['boat', 'car', 'bike', 'plane']
+    assert rick.willing_to_switch is True
+    assert rick.original_section == 'A03'
+    assert rick.gpa == 3.2
+
+    # matched by name fallback, empty survey response
+    jane = students['Doe, Jane']
+    assert jane.selections == []
+    assert jane.willing_to_switch is False
+    assert jane.gender == 'Female'
+    assert jane.original_section == 'A02'
+
+    # did not fill out the survey
+    pat = students['Poe, Pat']
+    assert pat.selections is None
+    assert pat.original_section is None
+
+    # a response without an ID makes the IDs floats, which still match
+    catme = pd.concat([catme, pd.DataFrame({'Name': ['Poe, Pat'],
+                                            'Student ID': [np.nan]})],
+                      ignore_index=True)
+    assert catme['Student ID'].dtype == float
+    students = populate_students(roster, catme)
+    assert students['Roe, Rick'].selections == ['boat', 'car', 'bike',
+                                                'plane']
+    assert students['Poe, Pat'].selections == []
+
+
+def test_read_catme(tmp_path):
+
+    roster = pd.DataFrame({'Name': ['Doe, Jane', 'Roe, Rick', 'Poe, Pat',
+                                    'Loe, Lou'],
+                           'ID': [1, 2, 3, 4],
+                           'Section': ['A02', 'A03', 'A02', 'A03']})
+    catme = pd.DataFrame({
+        'Name': ['Roe, Richard', 'Doe, Jane', 'Loe, Lou'],
+        'Student ID': [2, 99, 4],
+        'Email': ['rick@example.com', 'jane@example.com', 'lou@example.com'],
+        'Project Choice #1': ['Boat ', np.nan, 'car'],
+        'Project Choice #2': ['car', np.nan, np.nan],
+        'Project Choice #3': ['Bike', np.nan, 'boat'],
+        'Project Choice #4': ['plane', np.nan, 'Train'],
+        'Project Choice #5': [np.nan, np.nan, np.nan],
+        'Studio Section': ['A03', 'A03', 'A03'],
+        'Studio Switch': ['Yes', 'No', 'No'],
+        'Sex': ['Male', 'Female', np.nan],
+        'GPA': [3.2, 3.9, np.nan],
+        'Race': ['White', 'Asian', 'Asian']})
+    path = str(tmp_path / 'catme.csv')
+    catme.to_csv(path, index=False)
+
+    # categories accumulated across chunks of one row
+    compact = read_catme(path, chunksize=1)
+    assert 'Email' not in compact.columns
+    assert compact['Sex'].dtype == 'category'
+    assert (compact['Project Choice #1'].cat.categories.tolist() ==
+            compact['Project Choice #5'].cat.categories.tolist())
+    assert compact['Project Choice #3'].tolist()[2] == 'boat'
+
+    expected = populate_students(roster, catme)
+    students = populate_students(roster, compact)
+    assert compact['GPA'].dtype == float
+    for name, person in expected.items():
+        assert repr(students[name]) == repr(person)
+        assert type(students[name].gpa) is type(person.gpa)
+        np.testing.assert_equal(students[name].gpa, person.gpa)
+        assert students[name].selections == person.selections
+        assert students[name].willing_to_switch is person.willing_to_switch
+    assert students['Loe, Lou'].selections == ['car', 'boat', 'train']
+
+    # encoded straight from the tables, from the raw or the compact export
+    people = EncodedStudents(expected.values())
+    for table in [catme, compact]:
+        encoded = EncodedStudents.from_tables(roster, table)
+        for attr in ['names', 'gender_labels', 'race_labels',
+                     'section_labels', 'project_ids']:
+            assert getattr(encoded, attr) == getattr(people, attr)
+        for attr in ['genders', 'races', 'sections', 'willing_to_switch',
+                     'choices', 'gpas', 'response_lengths']:
+            np.testing.assert_array_equal(getattr(encoded, attr),
+                                          getattr(people, attr))
+    encoded = EncodedStudents.from_tables(roster, compact,
+                                          project_ids=['car', 'boat'])
+    np.testing.assert_array_equal(encoded.choices[3], [0, 1, -1, -1])
+    np.testing.assert_array_equal(encoded.num_choices(), [0, 4, 0, 3])
+
+    # the GPA can be a survey answer rather than a number
+    catme['GPA'] = ['a) 4.0-3.5', '3.9', np.nan]
+    catme.to_csv(path, index=False)
+    compact = read_catme(path)
+    assert compact['GPA'].tolist()[:2] == ['a) 4.0-3.5', '3.9']
+    assert populate_students(roster, compact)['Roe, Rick'].gpa == \
+        'a) 4.0-3.5'
+    encoded = EncodedStudents.from_tables(roster, compact)
+    np.testing.assert_array_equal(encoded.gpas, [3.9, np.nan, np.nan,
+                                                 np.nan])
+
+    catme.drop(columns='Race').to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        read_catme(path)
+
+
+def test_rank_projects():
+
+    projects = {p: Project(p, p.upper()) for p in ['a', 'b', 'c', 'd']}
+    students = {
+        'P0': Person('P0', selections=['a', 'b', 'c', 'e', 'b', 'd', 'a']),
+        'P1': Person('P1', selections=['b']),
+        'P2': Person('P2', selections=[]),
+        'P3': Person('P3'),
+        'P4': Person('P4', selections=['b', 'a']),
+    }
+
+    votes = rank_projects(students, projects)
+    assert votes['votes'].to_dict() == {'b': 4, 'a': 3, 'c': 1, 'd': 1,
+                                        'e': 1}
+    assert list(votes.index[:2]) == ['b', 'a']
+    assert votes.loc['c', 'title'] == 'C'
+    assert pd.isnull(votes.loc['e', 'title'])
+
+    # the five choices are worth 5 to 1 points, any more are worth nothing
+    rankings = rank_projects_weighted(students, projects)
+    assert rankings['votes'].to_dict() == {'a': 5 + 4, 'b': 4 + 1 + 5 + 5,
+                                           'c': 3, 'd': 0, 'e': 2}
+    assert list(rankings.index) == ['b', 'a', 'c', 'e', 'd']
+    # even if nobody made five choices
+    short = {'P1': students['P1'], 'P4': students['P4']}
+    assert rank_projects_weighted(short, projects)['votes'].to_dict() == {
+        'b': 10, 'a': 4, 'c': 0, 'd': 0}
+
+    rankings = rank_projects_weighted(students, projects,
+                                      weights=[1.0, 0.5])
+    assert rankings['votes'].to_dict() == {'a': 1.5, 'b': 2.5, 'c': 0.0,
+                                           'd': 0.0, 'e': 0.0}
+
+    # the same from the encoded students, which can be reused
+    encoded = EncodedStudents(students.values())
+    assert rank_projects(encoded, projects).equals(votes)
+    assert rank_projects_weighted(encoded, projects).equals(
+        rank_projects_weighted(students, projects))
+
+    assert rank_projects({}, projects)['votes'].to_dict() == dict.fromkeys(
+        projects, 0)
+
+
+def test_ranking_accumulator():
+
+    projects = {p: Project(p, p.upper()) for p in ['a', 'b', 'c', 'd']}
+    students = {
+        'P0': Person('P0', selections=['a', 'b', 'c', 'e', 'b']),
+        'P1': Person('P1', selections=['b']),
+        'P2': Person('P2', selections=[]),
+        'P4': Person('P4', selections=['b', 'a']),
+    }
+
+    def check():
+        assert accumulator.votes().equals(rank_projects(students, projects))
+        assert accumulator.rankings().equals(
+            rank_projects_weighted(students, projects, weights=[3, 2, 1]))
+
+    accumulator = RankingAccumulator(projects, weights=[3, 2, 1])
+    accumulator.add('P0', students['P0'].selections)
+    accumulator.update({k: p.selections for k, p in students.items()
+                        if k != 'P0'})
+    assert len(accumulator) == 3
+    check()
+
+    # edits replace the earlier response
+    students['P0'].selections = ['e', 'c']
+    accumulator.add('P0', ['e', 'c'])
+    check()
+    assert 'a' in accumulator.votes().index
+
+    students['P4'].selections = ['d']
+    accumulator.update([('P4', ['d']), ('P5', ['a'])])
+    accumulator.remove('P5')
+    check()
+    assert 'P5' not in accumulator
+    with pytest.raises(ValueError):
+        accumulator.remove('P5')
+
+    # responses from rows of the CATME export, keyed by ID
+    accumulator = RankingAccumulator(projects)
+    catme = pd.DataFrame({'Name': ['Doe, Jane', 'Roe, Rick'],
+                          'Student ID': [1, 2],
+                          'Project Choice #1': ['A ', 'b'],
+                          'Project Choice #2': ['b', np.nan],
+                          'Project Choice #3': [np.nan, np.nan],
+                          'Project Choice #4': [np.nan, np.nan],
+                          'Project Choice #5': [np.nan, np.nan]})
+    accumulator.update_from_catme(catme)
+    assert accumulator.rankings()['votes'].to_dict() == {
+        'a': 5, 'b': 9, 'c': 0, 'd': 0}
+    accumulator.update_from_catme(catme.iloc[1:].assign(
+        **{'Project Choice #1': 'c'}))
+    assert accumulator.rankings()['votes'].to_dict() == {
+        'a': 5, 'b': 4, 'c': 5, 'd': 0}
+
+    # students without an ID are keyed by their name
+    for ids in [['1', None, None], pd.array(['1', None, None], 'string')]:
+        accumulator = RankingAccumulator(projects)
+        accumulator.update_from_catme(pd.DataFrame({
+            'Name': ['Doe, Jane', 'Roe, Rick', 'Poe, Pat'],
+            'Student ID': ids,
+            'Project Choice #1': ['a', 'b', 'c'],
+            'Project Choice #2': [np.nan] * 3,
+            'Project Choice #3': [np.nan] * 3,
+            'Project Choice #4': [np.nan] * 3,
+            'Project Choice #5': [np.nan] * 3}))
+        assert len(accumulator) == 3
+        assert 'Roe, Rick' in accumulator and '1' in accumulator
+
+    # a resubmission in a batch with a blank ID, read as float IDs, replaces
+    # the earlier response
+    accumulator = RankingAccumulator(projects)
+    accumulator.update_from_catme(catme)
+    catme = pd.DataFrame({'Name': ['Roe, Rick', 'Poe, Pat'],
+                          'Student ID': [2, np.nan],
+                          'Project Choice #1': ['c', 'c'],
+                          'Project Choice #2': [np.nan, np.nan],
+                          'Project Choice #3': [np.nan, np.nan],
+                          'Project Choice #4': [np.nan, np.nan],
+                          'Project Choice #5': [np.nan, np.nan]})
+    accumulator.update_from_catme(catme)
+    assert len(accumulator) == 3
+    assert '2' in accumulator and '2.0' not in accumulator
+    assert accumulator.votes()['votes'].to_dict() == {
+        'a': 1, 'b': 1, 'c': 2, 'd': 0}
+
+
+def test_person_pool():
+
+    people = [Person('Doe, Jane', 'A02', False, 'Female', ['boat', 'car'],
+                     3.9, 'Asian'),
+              Person('Roe, Rick', 'A03', True, 'Male', ['car'], None,
+                     'White'),
+              Person('Poe, Pat')]
+    with pytest.raises(AttributeError):
+        people[0].nickname = 'JD'
+
+    pool = PersonPool(people, project_ids=['bike', 'boat', 'car'])
+    assert pool.genders.dtype == np.int8
+    np.testing.assert_array_equal(pool.ids, [0, 1, 2])
+    np.testing.assert_array_equal(pool.choices, [[1, 2], [2, -1], [-1, -1]])
+    np.testing.assert_array_equal(pool.responded, [True, True, False])
+    assert pool.nbytes() < 100
+
+    for person, view in zip(people, pool.people()):
+        assert repr(view) == repr(person)
+    assert pool.person(pool.index('Roe, Rick')).selections == ['car']
+    with pytest.raises(ValueError):
+        pool.index('Loe, Lou')
+
+    # changing a view leaves the pool alone
+    view = pool.person(0)
+    view.selections.append('bike')
+    assert pool.person(0).selections == ['boat', 'car']
+
+
+def test_student_pool():
+
+    people = [Person('P{}'.format(i), 'A02', i % 2 == 0, selections=['a'])
+              for i in range(5)]
+    pool = StudentPool(people)
+    assert list(pool) == people
+    assert len(pool) == 5
+    assert pool['P3'] is people[3]
+
+    choosers = pool.add_index(ChoiceIndex())
+    eligibility = pool.add_index(SectionIndex())
+    assert choosers.choosers('a') == people
+
+    pool.remove(people[1])
+    pool.discard(people[1])
+    assert people[1] not in pool
+    assert list(pool) == [people[0]] + people[2:]
+    assert choosers.choosers('a') == list(pool)
+    assert eligibility.eligible('A03') == {people[0], people[2], people[4]}
+    with pytest.raises(ValueError):
+        pool.remove(people[1])
+
+    # membership is by identity, not just by name
+    assert Person('P0') not in pool
+    with pytest.raises(ValueError):
+        pool.add(Person('P0'))
+
+    pool.add(people[1])
+    assert list(pool)[-1] is people[1]
+    assert choosers.choosers('a')[-1] is people[1]
+    assert people[1] in eligibility
+
+
+def test_section_index():
+
+    people = [Person('P{}'.format(i), section, willing)
+              for i, (section, willing) in enumerate(
+                  [('A02', False), ('A03', False), ('A02', True),
+                   ('A03', True), (None, None), ('A04', False)])]
+    index = SectionIndex(people, sections=['A02', 'A03'])
+    assert index.sections() == ['A02', 'A03', 'A04']
+
+    def check():
+        for section in ['A02', 'A03', 'A04', 'A05', None]:
+            expected = [p for p in people if p in index and
+                        p.can_attend(section)]
+            assert index.filter(people, section) == expected
+            assert index.eligible(section) == set(expected)
+
+    check()
+    assert len(index) == 6
+    index.remove(people[2])
+    index.remove(people[1])
+    assert people[2] not in index
+    assert not index.can_attend(people[2], 'A02')
+    check()
+    with pytest.raises(ValueError):
+        index.remove(people[2])
+
+    people += [Person('P6', 'A05', True), Person('P7', 'A05', False)]
+    index.add(people[-2])
+    index.add(people[-1])
+    check()
+
+
+def test_choice_index():
+
+    people = [Person('P0', selections=['a', 'b', 'c']),
+              Person('P1', selections=['b', 'a']),
+              Person('P2', selections=['c', 'a', 'a']),
+              Person('P3', selections=None),
+              Person('P4', selections=['a'])]
+    index = ChoiceIndex(people)
+
+    def scan(proj_id):
+        # what the team scripts did before
+        chose = [p for p in people if p in index and p.selections and
+                 p.chose_project(proj_id)]
+        return sorted(chose, key=lambda p: p.selections.index(proj_id))
+
+    for proj_id in ['a', 'b', 'c', 'd']:
+        assert index.choosers(proj_id) == scan(proj_id)
+    assert index.ranked_choosers('a') == [(people[0], 0), (people[4], 0),
+                                          (people[1], 1), (people[2], 1)]
+    assert index.num_choosers('a') == 4
+
+    index.remove(people[0])
+    assert people[0] not in index
+    assert len(index) == 4
+    for proj_id in ['a', 'b', 'c']:
+        assert index.choosers(proj_id) == scan(proj_id)
+    with pytest.raises(ValueError):
+        index.remove(people[0])
+
+    # equally ranked people are shuffled among themselves
+    shuffled = index.choosers('a', shuffle=lambda bucket: bucket.reverse())
+    assert shuffled == [people[4], people[2], people[1]]
+
+
+PROJECT_RST = """\
+{title}
+{underline}
+
+:id: {id}
+:title: {title}
+:org: Some Org
+:skills: welding, CAD
+
+A description of the project.
+"""
+
+
+def write_projects(directory, ids):
+    for proj_id in ids:
+        title = 'The {} project'.format(proj_id)
+        with open(os.path.join(str(directory), proj_id + '.rst'), 'w') as f:
+            f.write(PROJECT_RST.format(title=title, id=proj_id,
+                                       underline='=' * len(title)))
+
+
+def test_populate_projects(tmp_path):
+
+    write_projects(tmp_path, ['boat', 'car', 'bike'])
+
+    projects = populate_projects(str(tmp_path))
+
+    assert list(projects.keys()) == ['bike', 'boat', 'car']
+    assert projects['boat'].title == 'The boat project'
+
+    # ordered by the id in the file, not by the file name
+    os.rename(os.path.join(str(tmp_path), 'car.rst'),
+              os.path.join(str(tmp_path), 'a-car.rst'))
+    assert list(populate_projects(str(tmp_path)).keys()) == \
+        ['bike', 'boat', 'car']
+
+
+def test_populate_projects_workers(tmp_path):
+
+    ids = ['p{:02d}'.format(i) for i in range(12)]
+    write_projects(tmp_path, ids)
+
+    serial = populate_projects(str(tmp_path))
+    parallel = populate_projects(str(tmp_path), workers=3)
+
+    assert list(parallel.keys()) == list(serial.keys()) == ids
+    assert ([p.title for p in parallel.values()] ==
+            [p.title for p in serial.values()])
+
+    # a second file claiming an existing id
+    with open(os.path.join(str(tmp_path), 'p00.rst')) as src:
+        content = src.read()
+    with open(os.path.join(str(tmp_path), 'zz.rst'), 'w') as dst:
+        dst.write(content)
+
+    with pytest.raises(ValueError):
+        populate_projects(str(tmp_path), workers=3)
+
+
+def test_populate_projects_cache(tmp_path, monkeypatch):
+
+    project_dir = tmp_path / 'projects'
+    project_dir.mkdir()
+    write_projects(project_dir, ['boat', 'car'])
+    cache_path = str(tmp_path / 'cache.json')
+
+    projects = populate_projects(str(project_dir), cache_path=cache_path)
+    assert os.path.exists(cache_path)
+    assert projects['car'].title == 'The car project'
+
+    parsed = []
+    original_parse = teamo._parse_project_source
+
+    def counting_parse(text):
+        parsed.append(text)
+        return original_parse(text)
+
+    monkeypatch.setattr(teamo, '_parse_project_source', counting_parse)
+
+    # nothing has changed so nothing should be parsed
+    cached = populate_projects(str(project_dir), cache_path=cache_path)
+    assert parsed == []
+    assert [p.title for p in cached.values()] == \
+        [p.title for p in projects.values()]
+
+    # only the new and the edited file are parsed again
+    write_projects(project_dir, ['bike'])
+    with open(str(project_dir / 'car.rst'), 'a') as f:
+        f.write('\nMore description.\n')
+    projects = populate_projects(str(project_dir), cache_path=cache_path)
+    assert len(parsed) == 2
+    assert list(projects.keys()) == ['bike', 'boat', 'car']
+
+
+def test_team_tallies():
+
+    a = Person('a', 'A02', False, 'Female', ['boat', 'car'], 3.0, 'Asian')
+    b = Person('b', 'A03', True, 'Male', ['car'], 2.0, 'Black')
+    c = Person('c', 'A02', False, 'Other/Prefer not to answer', None, np.nan,
+               'White')
+
+    team = Team([a, b])
+    assert team.section() == 'A02'
+    assert team.num_members() == 2
+    assert team.num_females() == 1
+    assert team.has_only_one_female()
+    assert team.num_from_section('A03') == 1
+    assert team.num_chose('car') == 2
+    assert team.num_chose('boat') == 1
+    assert team.mean_gpa() == 2.5
+    assert team.num_underrepresented(['Female', 'Black']) == 2
+    # a member is counted once even if both their gender and race are in
+    # the groups
+    d = Person('d', 'A02', False, 'Female', None, None, 'Black')
+    assert Team([d]).num_underrepresented(['Female', 'Black']) == 1
+    assert Team([a, d]).num_underrepresented(['Female', 'Black']) == 2
+
+    team.add_member(c)
+    assert team.num_females() == 2
+    assert team.mean_gpa() == 2.5
+
+    team.remove_member(a)
+    assert team.num_members() == 2
+    assert team.num_females() == 1
+    assert team.num_chose('boat') == 0
+    assert team.mean_gpa() == 2.0
+    assert team.section() == 'A02'
+
+    with pytest.raises(ValueError):
+        team.remove_member(a)
+
+    team.remove_member(b)
+    team.remove_member(c)
+    assert team.section() is None
+    assert team.mean_gpa() is None
+
+    # GPAs that are survey answers rather than numbers are not averaged
+    e = Person('e', 'A02', False, 'Male', None, 'a) 4.0-3.5', 'White')
+    team = Team([e, a])
+    assert team.mean_gpa() == 3.0
+    team.remove_member(a)
+    assert team.mean_gpa() is None
+
+
+def test_team_assignment_scores():
+
+    people = [Person('a', 'A02', False, 'Female', ['A', 'B'], 3.0, 'Asian'),
+              Person('b', 'A02', True, 'Male', ['B', 'A'], 2.0, 'White'),
+              Person('c', 'A02', False, 'Male', ['C', 'A', 'D'], 3.5,
+                     'Black'),
+              Person('d', 'A03', False, 'Female', ['C', 'D'], 3.1, 'White'),
+              Person('e', 'A03', True, 'Male', [], np.nan, 'White')]
+    encoded = EncodedStudents(people, ['A', 'B', 'C', 'D', 'E'])
+
+    first = Team(people[:3])
+    second = Team(people[3:])
+    assignment = TeamAssignment.from_teams(encoded, [first, second])
+
+    np.testing.assert_array_equal(assignment.sizes(), [3, 2])
+    np.testing.assert_allclose(assignment.mean_gpas(), [8.5 / 3, 3.1])
+
+    q = ProjectRankQuestion(['A', 'B', 'C', 'D', 'E'])
+    fit = assignment.score_project_fit([0, 3])
+    assert fit[0] == q.compute_score('A', [p.selections for p in people[:3]])
+    assert fit[1] == q.compute_score('D', [p.selections for p in people[3:]])
+    fit = assignment.score_project_fit([0, 3], ordered=True)
+    assert fit[0] == q.compute_score('A', [p.selections for p in people[:3]],
+                                     ordered=True)
+    assert fit[1] == q.compute_score('D', [p.selections for p in people[3:]],
+                                     ordered=True)
+
+    # as in ProjectRankQuestion a project chosen twice ranks by its last
+    # position and choices of unknown projects count towards the longest
+    # response
+    messy = [['A', 'X', 'B', 'A', 'Y'], ['Y', 'B'], ['Z', 'Z', 'Z']]
+    messy_people = [Person(str(i), selections=s) for i, s in enumerate(messy)]
+    messy_encoded = EncodedStudents(messy_people, ['A', 'B', 'C', 'D', 'E'])
+    np.testing.assert_array_equal(messy_encoded.num_choices(), [5, 2, 3])
+    messy_assignment = TeamAssignment(messy_encoded, [0, 0, 0])
+    for j, proj_id in enumerate(['A', 'B']):
+        for ordered in [False, True]:
+            fit = messy_assignment.score_project_fit([j], ordered=ordered)
+            assert fit[0] == q.compute_score(proj_id, messy, ordered=ordered)
+
+    q = UnderrepresentedMemberQuestion(['Female', 'Black'])
+    np.testing.assert_array_equal(
+        assignment.score_underrepresented(['Female', 'Black']),
+        [q.compute_score(['Female', 'Male', 'Black']),
+         q.compute_score(['Female', 'Male'])])
+
+    q = MultipleChoiceSingleAnswerQuestion('Race?', encoded.race_labels)
+    np.testing.assert_allclose(
+        assignment.score_multiple_choice(encoded.races,
+                                         len(encoded.race_labels)),
+        [q.compute_score([p.race for p in people[:3]]),
+         q.compute_score([p.race for p in people[3:]])])
+
+    assert not assignment.section_conflicts().any()
+    # c can't attend A03 but b can
+    swapped = TeamAssignment(encoded, [0, 1, 1, 1, 1], 2,
+                             assignment.team_sections)
+    np.testing.assert_array_equal(swapped.section_conflicts(),
+                                  [False, False, True, False, False])
+
+    # a batch of candidate assignments is counted in one call
+    batch = np.array([[0, 0, 0, 1, 1], [1, 1, 0, 0, 0]])
+    counts = team_label_counts(batch, encoded.genders, 2,
+                               len(encoded.gender_labels))
+    assert counts.shape == (2, 2, 2)
+    np.testing.assert_array_equal(counts[0], [[1, 2], [1, 1]])
+    np.testing.assert_array_equal(counts[1], [[1, 2], [1, 1]])
+
+
+def test_multiple_choice_single_answer_question_batch():
+
+    choices = ["a) 4.0-3.5",
+               "b) 3.4-2.8",
+               "c) 2.7-2.0",
+               "d) 1.9 or below"]
+    q = MultipleChoiceSingleAnswerQuestion("GPA?", choices)
+
+    responses = ["a) 4.0-3.5", "a) 4.0-3.5", "b) 3.4-2.8", "c) 2.7-2.0",
+                 "c) 2.7-2.0", "b) 3.4-2.8", "b) 3.4-2.8", "no answer"]
+    codes = q.encode(responses)
+    np.testing.assert_array_equal(codes, [0, 0, 1, 2, 2, 1, 1, -1])
+
+    teams = np.array([0, 0, 0, 0, 0, 1, 1, 1])
+    scores = q.compute_scores(codes, teams)
+    assert scores[0] == q.compute_score(responses[:5]) == 3.0 / 5.0
+    assert scores[1] == q.compute_score(responses[5:]) == 1.0 / 3.0
+
+    # several candidate assignments at once
+    batch = np.array([teams, teams[::-1]])
+    scores = q.compute_scores(codes, batch)
+    assert scores.shape == (2, 2)
+    np.testing.assert_array_equal(scores[0], [3.0 / 5.0, 1.0 / 3.0])
+
+    # the per team and the batch scores agree on random teams
+    rng = Random(0)
+    for _ in range(50):
+        responses = [rng.choice(choices + ['no answer']) for _ in range(12)]
+        teams = np.array([rng.randrange(4) for _ in responses])
+        scores = q.compute_scores(q.encode(responses), teams, 4)
+        for t in range(4):
+            team = [r for r, i in zip(responses, teams) if i == t]
+            if team:
+                assert scores[t] == q.compute_score(team)
+
+
+def test_project_rank_question_indexed():
+
+    all_projects = ['A', 'B', 'C', 'D', 'E']
+    responses = [['A', 'B'],
+                 ['B', 'A'],
+                 ['C', 'A', 'D'],
+                 ['E', 'D', 'C', 'B', 'A'],
+                 [],
+                 ['D'],
+                 # repeated and unknown projects
+                 ['A', 'X', 'B', 'A'],
+                 ['Z', 'B', 'B']]
+
+    q = ProjectRankQuestion(all_projects, responses)
+
+    rng = Random(0)
+    assignments = [np.array([0, 0, 0, 1, 1, 1, 0, 1])]
+    for _ in range(20):
+        assignments.append(np.array([rng.randrange(3) for _ in responses]))
+    for teams in assignments:
+        num_teams = teams.max() + 1
+        for ordered in [False, True]:
+            scores = q.compute_scores(teams, ordered=ordered)
+            assert scores.shape == (num_teams, 5)
+            for t in range(num_teams):
+                members = np.flatnonzero(teams == t)
+                # compute_score can't score a team without any choices
+                if not any(responses[i] for i in members):
+                    continue
+                for j, proj_id in enumerate(all_projects):
+                    expected = q.compute_score(
+                        proj_id, [responses[i] for i in members],
+                        ordered=ordered)
+                    assert np.isclose(scores[t, j], expected)
+                    assert np.isclose(q.compute_team_score(
+                        proj_id, members, ordered=ordered), expected)
+
+
+def test_import_time(tmp_path):
+
+    # run from another directory so only teamo is picked up from this one
+    code = '\n'.join([
+        'import sys, time',
+        'sys.path.append({!r})'.format(os.path.dirname(teamo.__file__)),
+        'start = time.perf_counter()',
+        'import teamo',
+        'print(time.perf_counter() - start)',
+        "print(' '.join(m for m in ['numpy', 'pandas', 'docutils', 'yaml']",
+        '               if m in sys.modules))'])
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=str(tmp_path))
+    duration, heavy_modules = output.decode().split('\n')[:2]
+
+    assert heavy_modules == ''
+    assert float(duration) < 0.25